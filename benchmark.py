@@ -0,0 +1,139 @@
+# Times every processing function and the whole ProcessData pipeline on
+# synthetic data directories of growing size (see synthetic_data.py) and
+# saves the results as JSON so runs can be compared.
+#
+# Usage:
+#   python benchmark.py [--rows 1000 10000 ...] [--output results.json] [--compare previous.json]
+#
+# 10^8 rows means a ~9 GB layoffs.csv in the temporary directory and
+# enough memory to hold it as a DataFrame.
+
+import argparse
+import json
+import logging
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from data_processing import ProcessData
+from instrumentation import Profiler
+from synthetic_data import write_dataset
+
+
+logging.getLogger().setLevel('ERROR')
+
+ROW_COUNTS = [10**3, 10**4, 10**5, 10**6]
+# A function this much slower than in the compared run is reported
+REGRESSION = 1.2
+# Timings shorter than this (s) are too noisy to compare
+MIN_TIME = 0.005
+
+
+def run_pipeline(data_directory: str, track_memory: bool, **options) -> tuple:
+    """
+    End-to-end wall time and the profiler of one ProcessData run
+    """
+    profiler = Profiler(track_memory=track_memory)
+    start = time.perf_counter()
+    ProcessData(data_directory, profiler=profiler, **options).process()
+    return time.perf_counter() - start, profiler
+
+
+def benchmark_rows(rows: int, repeat: int, seed: int, **options) -> dict:
+    """
+    Best of repeat timed runs (without memory tracking, which slows the
+    calls down) and one run with tracemalloc for the peak memory of
+    every read and function
+    """
+    with tempfile.TemporaryDirectory() as data_directory:
+        start = time.perf_counter()
+        write_dataset(data_directory, rows, seed=seed)
+        generate_time = time.perf_counter() - start
+        runs = [run_pipeline(data_directory, False, **options) for _ in range(repeat)]
+        _, memory_profiler = run_pipeline(data_directory, True, **options)
+    functions = {}
+    for _, profiler in runs:
+        for record in profiler.records:
+            key = f'{record["stage"]}:{record["name"]}'
+            entry = functions.setdefault(key, {'wall_time': float('inf'), 'rows_in': record['rows_in'],
+                                               'rows_out': record['rows_out']})
+            entry['wall_time'] = min(entry['wall_time'], record['wall_time'])
+    for record in memory_profiler.records:
+        functions[f'{record["stage"]}:{record["name"]}']['peak_memory'] = record['peak_memory']
+    return {'rows': rows,
+            'generate_time': generate_time,
+            'end_to_end': min(wall_time for wall_time, _ in runs),
+            'peak_memory': max(record['peak_memory'] for record in memory_profiler.records),
+            'functions': functions,
+            }
+
+
+def environment() -> dict:
+    """
+    What the results depend on besides the code
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {'commit': commit,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+
+
+def compare(previous: dict, current: dict) -> list:
+    """
+    Functions (and end-to-end runs) that got slower than REGRESSION times
+    """
+    regressions = []
+    previous_runs = {run['rows']: run for run in previous['runs']}
+    for run in current['runs']:
+        old = previous_runs.get(run['rows'])
+        if not old:
+            continue
+        timings = [('end_to_end', old['end_to_end'], run['end_to_end'])]
+        timings += [(name, old['functions'][name]['wall_time'], entry['wall_time'])
+                    for name, entry in run['functions'].items() if name in old['functions']]
+        for name, old_time, new_time in timings:
+            if old_time > MIN_TIME and new_time / old_time > REGRESSION:
+                regressions.append((run['rows'], name, old_time, new_time))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark ProcessData on synthetic data')
+    parser.add_argument('--rows', type=int, nargs='+', default=ROW_COUNTS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--fused', action='store_true')
+    parser.add_argument('--compact', action='store_true')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', metavar='PREVIOUS', help='results of an earlier run to check for regressions')
+    args = parser.parse_args()
+    options = {'workers': args.workers, 'fused': args.fused, 'compact': args.compact}
+    results = {'environment': environment(), 'options': options, 'runs': []}
+    print(f'{"rows":>11} {"end-to-end (s)":>15} {"peak memory (MB)":>17} {"slowest function":>40}')
+    for rows in args.rows:
+        run = benchmark_rows(rows, args.repeat, args.seed, **options)
+        results['runs'].append(run)
+        slowest = max(run['functions'], key=lambda name: run['functions'][name]['wall_time'])
+        print(f'{rows:>11} {run["end_to_end"]:>15.4f} {run["peak_memory"]/2**20:>17.1f} {slowest:>40}')
+    # Unix only, kilobytes on Linux
+    results['max_rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with open(args.output, 'w') as results_file:
+        json.dump(results, results_file, indent=1)
+    print(f'Saved {args.output}')
+    if args.compare:
+        with open(args.compare, 'r') as previous_file:
+            regressions = compare(json.load(previous_file), results)
+        for rows, name, old_time, new_time in regressions:
+            print(f'{rows:>11} {name}: {old_time:.4f} s -> {new_time:.4f} s ({new_time/old_time:.1f}x)')
+        print(f'{len(regressions)} regressions over {REGRESSION}x')
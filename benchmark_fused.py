@@ -0,0 +1,54 @@
+import time
+import logging
+import numpy as np
+import pandas as pd
+from data_processing import ProcessData
+
+
+logging.getLogger().setLevel('ERROR')
+
+ROW_COUNTS = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def resample_layoffs(layoffs: pd.DataFrame, rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Bootstrap rows of the real layoffs data up to the requested size
+    """
+    rng = np.random.default_rng(seed)
+    return layoffs.iloc[rng.integers(0, len(layoffs), rows)].reset_index(drop=True)
+
+
+def time_layoffs(processor: ProcessData, data: pd.DataFrame, repeat: int = 3) -> tuple:
+    """
+    Best wall time of the layoff functions and their last results
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = processor._ProcessData__process_functions({'layoffs': data})
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def assert_same(expected: dict, actual: dict) -> None:
+    """
+    Fused results have to match the per-function results
+    """
+    for name, result in expected.items():
+        if isinstance(result, pd.Series):
+            pd.testing.assert_series_equal(result, actual[name], check_dtype=False)
+        else:
+            pd.testing.assert_frame_equal(result, actual[name], check_dtype=False)
+
+
+if __name__ == '__main__':
+    layoffs = pd.read_csv('data/layoffs.csv')
+    per_function = ProcessData('data')
+    fused = ProcessData('data', fused=True)
+    print(f'{"rows":>10} {"per-function (s)":>18} {"fused (s)":>10} {"speedup":>8}')
+    for rows in ROW_COUNTS:
+        data = resample_layoffs(layoffs, rows)
+        baseline_time, baseline = time_layoffs(per_function, data)
+        fused_time, fused_results = time_layoffs(fused, data)
+        assert_same(baseline, fused_results)
+        print(f'{rows:>10} {baseline_time:>18.4f} {fused_time:>10.4f} {baseline_time/fused_time:>7.1f}x')
@@ -0,0 +1,36 @@
+import sys
+import time
+import subprocess
+
+
+# Statements timed in a fresh interpreter, the startup of short-lived jobs
+STATEMENTS = {'python': 'pass',
+              'ReadData': 'from read_data import ReadData',
+              'ProcessData': 'from data_processing import ProcessData',
+              'QueryService': 'from query_service import QueryService',
+              'cli': 'import cli',
+              'pandas': 'import pandas',
+              'data_viz': 'import data_viz',
+              }
+HEAVY_MODULES = ('pandas', 'numpy', 'matplotlib')
+
+
+def time_import(statement: str, repeat: int) -> tuple:
+    """
+    Best wall time of a fresh interpreter running statement, and the heavy modules it imported
+    """
+    check = f'{statement}; import sys; print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', check], capture_output=True, text=True, check=True).stdout
+        best = min(best, time.perf_counter() - start)
+    return best, output.strip()
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f'{"import":>13} {"best (ms)":>10}  heavy modules loaded')
+    for name, statement in STATEMENTS.items():
+        best, heavy = time_import(statement, repeat)
+        print(f'{name:>13} {best*1000:>10.1f}  {heavy or "-"}')
@@ -0,0 +1,45 @@
+import os
+import time
+import logging
+import tempfile
+from ingest_challenger_pdfs import PdfIngestor
+from challenger_csv import read_challenger_csv
+
+
+logging.getLogger().setLevel('ERROR')
+
+ARCHIVE = 'data/challenger_data/archive'
+
+
+def time_ingest(workers: int, output_dir: str) -> tuple:
+    """
+    Wall time, reports and pages of one ingest run
+    """
+    ingestor = PdfIngestor(ARCHIVE, output_dir, workers)
+    start = time.perf_counter()
+    reports = ingestor.process()
+    return time.perf_counter() - start, len(reports), ingestor.pages
+
+
+def check_round_trip(output_dir: str) -> int:
+    """
+    Every extracted table has to read back through the typed Challenger reader
+    """
+    tables = 0
+    for output_file in sorted(os.listdir(output_dir)):
+        if output_file.endswith('.csv'):
+            read_challenger_csv(os.path.join(output_dir, output_file))
+            tables += 1
+    return tables
+
+
+if __name__ == '__main__':
+    worker_counts = sorted({1, 2, 4, os.cpu_count()})
+    print(f'{"workers":>8} {"cold (s)":>9} {"reports/s":>10} {"pages/s":>8} {"warm (s)":>9}')
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory() as output_dir:
+            cold, reports, pages = time_ingest(workers, output_dir)
+            warm, _, _ = time_ingest(workers, output_dir)
+            tables = check_round_trip(output_dir)
+        print(f'{workers:>8} {cold:>9.2f} {reports/cold:>10.2f} {pages/cold:>8.1f} {warm:>9.3f}')
+    print(f'{tables} extracted tables read back through read_challenger_csv')
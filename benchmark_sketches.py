@@ -0,0 +1,72 @@
+import time
+import logging
+import tracemalloc
+import pandas as pd
+from data_processing import ProcessData
+from layoff_aggregates import HIGH_PERCENTAGE
+from sketches import SketchLayoffs, SKETCH_FUNCTIONS
+from synthetic_data import generate_layoffs
+
+
+logging.getLogger().setLevel('ERROR')
+
+ROW_COUNTS = [100_000, 1_000_000]
+TOP = 50
+
+
+def run(function, *args) -> tuple:
+    """
+    Wall time, peak traced memory (MB) and result of one call
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def exact_layoffs(processor: ProcessData, data: pd.DataFrame) -> dict:
+    """
+    Exact results of the functions the sketches approximate
+    """
+    results = processor._ProcessData__process_functions({'layoffs': data})
+    return {name: results[name] for name in SKETCH_FUNCTIONS}
+
+
+def company_errors(exact: pd.DataFrame, approximate: pd.DataFrame) -> tuple:
+    """
+    Recall of the exact top companies and largest relative error of their totals
+    """
+    expected = exact['total_laid_off'][:TOP]
+    found = approximate['total_laid_off'].reindex(expected.index)
+    recall = found.notna().mean()
+    error = ((found - expected).abs() / expected).max()
+    return recall, error
+
+
+def distinct_error(data: pd.DataFrame, approximate: pd.DataFrame, key: str) -> float:
+    """
+    Largest relative error of the distinct high percentage companies per key
+    """
+    high = data.loc[data['percentage_laid_off'] > HIGH_PERCENTAGE]
+    exact = high.groupby(key)['company'].nunique()
+    counts = approximate['number of companies'].drop('Other Countries', errors='ignore')
+    return (counts - exact.reindex(counts.index)).abs().div(exact.reindex(counts.index)).max()
+
+
+if __name__ == '__main__':
+    processor = ProcessData('data', fused=True)
+    sketch = SketchLayoffs(top=TOP)
+    print(f'{"rows":>10} {"exact (s)":>10} {"exact (MB)":>11} {"sketch (s)":>11} {"sketch (MB)":>12}'
+          f' {"recall":>7} {"max error":>10} {"distinct error":>15}')
+    for rows in ROW_COUNTS:
+        data = generate_layoffs(rows, companies=rows // 2)
+        exact_time, exact_peak, exact = run(exact_layoffs, processor, data)
+        sketch_time, sketch_peak, approximate = run(sketch.process, data)
+        recall, error = company_errors(exact['__company_layoffs'], approximate['__company_layoffs'])
+        distinct = max(distinct_error(data, approximate['__high_per_industry'], 'industry'),
+                       distinct_error(data, approximate['__high_per_country'], 'country'))
+        print(f'{rows:>10} {exact_time:>10.3f} {exact_peak:>11.1f} {sketch_time:>11.3f} {sketch_peak:>12.1f}'
+              f' {recall:>7.2f} {error:>10.4f} {distinct:>15.4f}')
@@ -0,0 +1,79 @@
+from __future__ import annotations
+import re
+import logging
+from lazy_import import lazy_module
+
+
+logger = logging.getLogger(__name__)
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+# Kinds of the headers of a Challenger table
+YEAR = 'year'
+MONTH = 'month'
+LABEL = 'label'
+YEAR_PATTERN = re.compile(r'\d{4}')
+# Month snapshot columns, e.g. 'DECEMBER', '0December', '21-Dec' or
+# 'Dec-21' (as ingest_challenger_pdfs.py writes them)
+MONTH_PATTERN = re.compile(r'(\d{1,2}-?)?(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*(-\d{2})?', re.IGNORECASE)
+# Label of the row holding the column totals
+TOTAL_ROW = 'TOTAL'
+
+
+def classify_header(header: str) -> str:
+    """
+    YEAR for a year ('2021'), MONTH for a month snapshot ('21-Dec'),
+    LABEL otherwise
+    """
+    if YEAR_PATTERN.fullmatch(header):
+        return YEAR
+    if MONTH_PATTERN.fullmatch(header):
+        return MONTH
+    return LABEL
+
+
+def read_challenger_csv(filepath: str) -> pd.DataFrame:
+    """
+    Reads a table written by process_challenger_tables.py: ', ' separated
+    fields, the row labels in the first column and integer counts in the
+    others. Fields are stripped of surrounding whitespace, year columns
+    are labelled with the year as an int and every count column is parsed
+    straight into an int64 array. Raises a ValueError for a row with the
+    wrong number of fields or a count that is not an integer. When the
+    table has a TOTAL row, each column is checked against it and a
+    mismatch is logged.
+    """
+    with open(filepath, 'r') as table:
+        rows = [[field.strip() for field in line.split(',')] for line in table if line.strip()]
+    headers = rows[0]
+    kinds = [classify_header(header) for header in headers[1:]]
+    if LABEL in kinds:
+        raise ValueError(f'{filepath}: {[h for h, k in zip(headers[1:], kinds) if k == LABEL]} are not count columns')
+    for line, row in enumerate(rows[1:], start=2):
+        if len(row) != len(headers):
+            raise ValueError(f'{filepath} line {line}: {len(row)} fields, expected {len(headers)}')
+    labels = [row[0] for row in rows[1:]]
+    fields = np.array([row[1:] for row in rows[1:]], dtype=str).reshape(len(labels), len(kinds))
+    try:
+        counts = fields.astype('int64')
+    except ValueError as e:
+        raise ValueError(f'{filepath}: {e}') from None
+    columns = [int(header) if kind == YEAR else header for header, kind in zip(headers[1:], kinds)]
+    data = pd.DataFrame(counts, columns=columns)
+    data.insert(0, headers[0], labels)
+    _check_totals(filepath, labels, columns, counts)
+    logger.debug(f'Read {filepath}: {len(labels)} rows, {kinds.count(YEAR)} years, {kinds.count(MONTH)} snapshots')
+    return data
+
+
+def _check_totals(filepath: str, labels: list, columns: list, counts: np.ndarray) -> None:
+    """
+    Logs the columns whose sum differs from the TOTAL row
+    """
+    if TOTAL_ROW not in labels:
+        return
+    total_row = labels.index(TOTAL_ROW)
+    sums = counts.sum(axis=0) - counts[total_row]
+    for column, expected, found in zip(columns, counts[total_row], sums):
+        if expected != found:
+            logger.warning(f'{filepath}: column {column} sums to {found}, the TOTAL row is {expected}')
@@ -0,0 +1,104 @@
+from __future__ import annotations
+import logging
+from layoff_aggregates import LayoffAggregates, KEY_COLUMNS
+from lazy_import import lazy_module
+
+
+logger = logging.getLogger(__name__)
+pd = lazy_module('pandas')
+
+
+class ChunkedLayoffs():
+    """
+    Streams the layoffs data one chunk at a time, so the peak memory is
+    bounded by the chunk size instead of the file size.
+
+    Every chunk is folded into mergeable LayoffAggregates (sums and
+    counts per key), the intermediate functions (row filters such as
+    __funded_companies) are applied per chunk and their rows
+    concatenated, and the layoff rows of the requested companies are
+    kept for __company_comp_salaries.
+
+    Attributes
+    ----------
+    intermediate_functions: list
+        Row filters applied to each chunk, results are concatenated
+    companies: list
+        Lowercase names of the companies whose layoff rows are kept
+
+    Public Methods
+    ----------
+    process(chunks):
+        Returns a dictionary with the result of every fused layoff
+        function and intermediate function, and the kept company rows
+        under '__company_rows'
+    """
+    def __init__(self, intermediate_functions: list, companies: list) -> None:
+        self.intermediate_functions = intermediate_functions
+        self.companies = companies
+
+    def __repr__(self) -> str:
+        return f'ChunkedLayoffs object\nCompanies: {len(self.companies)}'
+
+    def process(self, chunks) -> dict:
+        aggregates = None
+        pieces = {func.__name__: [] for func in self.intermediate_functions}
+        company_rows = []
+        rows = 0
+        for chunk in chunks:
+            partial = LayoffAggregates.from_frame(chunk)
+            aggregates = partial if aggregates is None else aggregates.merge(partial)
+            for func in self.intermediate_functions:
+                pieces[func.__name__].append(func(chunk))
+            company_layoffs = chunk[['company', 'percentage_laid_off']]
+            company_rows.append(company_layoffs.loc[company_layoffs['company'].str.lower().isin(self.companies)])
+            rows += len(chunk)
+        if aggregates is None:
+            columns = list(KEY_COLUMNS) + ['total_laid_off', 'percentage_laid_off', 'funds_raised']
+            aggregates = LayoffAggregates.from_frame(pd.DataFrame(columns=columns))
+        results = aggregates.results()
+        for name, name_pieces in pieces.items():
+            results[name] = pd.concat(name_pieces) if name_pieces else None
+        results['__company_rows'] = pd.concat(company_rows) if company_rows else None
+        logger.debug(f'Streamed {rows} layoff rows')
+        return results
+
+
+class ChunkedSalaries():
+    """
+    Streams the salaries data one chunk at a time and keeps the per
+    company sum and count of the compensation (and of the row index,
+    which __company_comp_salaries also averages) for the requested
+    companies only.
+
+    Attributes
+    ----------
+    companies: list
+        Lowercase names of the companies that are averaged
+
+    Public Methods
+    ----------
+    process(chunks):
+        Returns the average compensation per company, the same frame
+        __company_comp_salaries computes from the whole salaries data
+    """
+    def __init__(self, companies: list) -> None:
+        self.companies = companies
+
+    def __repr__(self) -> str:
+        return f'ChunkedSalaries object\nCompanies: {len(self.companies)}'
+
+    def process(self, chunks) -> pd.DataFrame:
+        totals = None
+        for chunk in chunks:
+            # The chunk index continues across chunks, so it is the row
+            # index of the whole file
+            companies = chunk[['company', 'totalyearlycompensation']].reset_index()
+            companies.company = companies.company.str.lower()
+            top_companies = companies.loc[companies['company'].isin(self.companies)]
+            partial = top_companies.groupby('company').agg(['sum', 'count'])
+            totals = partial if totals is None else totals.add(partial, fill_value=0)
+        if totals is None:
+            return pd.DataFrame(columns=['company', 'index', 'totalyearlycompensation'])
+        average_compensation = totals.xs('sum', axis=1, level=1) / totals.xs('count', axis=1, level=1)
+        return average_compensation.astype(int).reset_index()
@@ -0,0 +1,114 @@
+# Command line entry point of the project.
+#
+# Only argparse is imported at startup, each subcommand imports what it
+# needs when it runs, so short-lived jobs don't pay for matplotlib or
+# pypdf (or pandas before the data is read).
+#
+# Usage:
+#   python cli.py process [DATA_DIR] [--workers N] [--fused] [--compact] [--chunksize N]
+#                         [--cache-dir DIR] [--output-dir DIR] [--pipeline [MAX_RESIDENT]]
+#       runs ProcessData, prints the shape of every output and optionally
+#       writes each one to OUTPUT_DIR/<output_df>/<name>.csv. With
+#       --pipeline reads and processing overlap and every result is
+#       printed as soon as it is ready (see ProcessData.stream)
+#   python cli.py render [--data DIR] [--output-dir plots] [--format png svg]
+#                        [--workers N] [--force]
+#       renders every figure headless, see data_viz.py
+#   python cli.py extract [--archive DIR] [--output-dir DIR] [--workers N] [--text DIR] [--columns N]
+#       extracts the Challenger tables from the report archive (and the
+#       text tables of --text), see ingest_challenger_pdfs.py
+
+import argparse
+import logging
+import os
+
+
+logger = logging.getLogger(__name__)
+
+
+def process(args: argparse.Namespace) -> None:
+    from data_processing import ProcessData
+    processor = ProcessData(args.data_directory, fused=args.fused, workers=args.workers, compact=args.compact,
+                            chunksize=args.chunksize, cache_dir=args.cache_dir)
+    if args.pipeline:
+        import asyncio
+        processed = asyncio.run(stream(processor, args.pipeline))
+    else:
+        processed = processor.process()
+    for output_df, results in processed.items():
+        if args.output_dir:
+            os.makedirs(os.path.join(args.output_dir, output_df), exist_ok=True)
+        for name, result in results.items():
+            print(f'{output_df}.{name}: {result.shape}')
+            if args.output_dir:
+                result.to_csv(os.path.join(args.output_dir, output_df, f'{str(name).lstrip("_")}.csv'))
+
+
+async def stream(processor, max_resident: int) -> dict:
+    async for output_df, name, result in processor.stream(max_resident):
+        logger.info(f'{output_df}.{name or output_df} ready: {result.shape}')
+    return processor.processed
+
+
+def render(args: argparse.Namespace) -> None:
+    from data_viz import load_data, render_all
+    data = load_data(args.data)
+    for name, paths in render_all(data, args.output_dir, tuple(args.format), args.workers, args.force).items():
+        print(f'{name}: {", ".join(paths) or "up to date"}')
+
+
+def extract(args: argparse.Namespace) -> None:
+    from ingest_challenger_pdfs import PdfIngestor
+    ingestor = PdfIngestor(args.archive, args.output_dir, args.workers)
+    for report, entry in ingestor.process().items():
+        print(f'{report}: {", ".join(entry["outputs"]) or entry["skipped"]}')
+    if args.text:
+        from process_challenger_tables import convert_directory
+        for output_file in convert_directory(args.text, args.output_dir, args.columns):
+            print(output_file)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Process, plot and extract the layoff data')
+    parser.add_argument('--verbose', action='store_true', help='log at INFO level')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    process_parser = subparsers.add_parser('process', help='process the datasets of a data directory')
+    process_parser.add_argument('data_directory', nargs='?', default='data')
+    process_parser.add_argument('--workers', type=int, default=1)
+    process_parser.add_argument('--fused', action='store_true')
+    process_parser.add_argument('--compact', action='store_true')
+    process_parser.add_argument('--chunksize', type=int, default=None)
+    process_parser.add_argument('--cache-dir', default=None)
+    process_parser.add_argument('--output-dir', default=None, help='write every output to OUTPUT_DIR/<output_df>/<name>.csv')
+    process_parser.add_argument('--pipeline', type=int, nargs='?', const=4, default=None, metavar='MAX_RESIDENT',
+                                help='overlap reads and processing, with at most MAX_RESIDENT files read ahead')
+    process_parser.set_defaults(run=process)
+
+    render_parser = subparsers.add_parser('render', help='render every figure headless')
+    render_parser.add_argument('--data', default='data')
+    render_parser.add_argument('--output-dir', default='plots')
+    render_parser.add_argument('--format', nargs='+', default=['png'], choices=['png', 'svg', 'pdf'])
+    render_parser.add_argument('--workers', type=int, default=None)
+    render_parser.add_argument('--force', action='store_true', help='render figures even if their inputs are unchanged')
+    render_parser.set_defaults(run=render)
+
+    extract_parser = subparsers.add_parser('extract', help='extract the Challenger tables')
+    extract_parser.add_argument('--archive', default='data/challenger_data/archive')
+    extract_parser.add_argument('--output-dir', default='data/challenger_data/extracted')
+    extract_parser.add_argument('--workers', type=int, default=None)
+    extract_parser.add_argument('--text', metavar='DIRECTORY', help='also convert every .txt table in DIRECTORY')
+    extract_parser.add_argument('--columns', type=int, default=None, help='fields per row of the text tables')
+    extract_parser.set_defaults(run=extract)
+    return parser
+
+
+def main(argv: list = None) -> None:
+    args = build_parser().parse_args(argv)
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO)
+    args.run(args)
+
+
+if __name__ == '__main__':
+    main()
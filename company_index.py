@@ -0,0 +1,74 @@
+from __future__ import annotations
+import logging
+from lazy_import import lazy_module
+
+
+logger = logging.getLogger(__name__)
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+
+class CompanyIndex():
+    """
+    Index from lowercased company name to the rows of a dataset.
+
+    The names are lowercased and factorized once (for a categorical
+    column only its categories are lowercased and the codes are mapped),
+    and the row positions are grouped by code. Selecting the rows of a
+    set of companies then only touches those companies' rows instead of
+    lowercasing and scanning the whole column again.
+
+    Attributes
+    ----------
+    data: pd.DataFrame
+        The indexed dataset
+    column: str
+        The company name column
+    names: pd.Index
+        The distinct lowercased company names
+
+    Public Methods
+    ----------
+    positions(companies):
+        Returns the sorted row positions of the given companies
+    select(companies):
+        Returns the rows of the given companies, in their original order
+    normalized(companies):
+        Same as select, with the company names lowercased
+    """
+    def __init__(self, data: pd.DataFrame, column: str = 'company') -> None:
+        self.data = data
+        self.column = column
+        companies = data[column]
+        if isinstance(companies.dtype, pd.CategoricalDtype):
+            category_codes, uniques = pd.factorize(companies.cat.categories.str.lower())
+            row_codes = companies.cat.codes.to_numpy()
+            codes = np.where(row_codes >= 0, category_codes[row_codes], -1)
+        else:
+            codes, uniques = pd.factorize(companies.str.lower())
+        self.names = pd.Index(uniques)
+        self.__codes = codes
+        # Rows sorted by code, the rows of code c are order[offsets[c]:offsets[c+1]]
+        order = np.argsort(codes, kind='stable')
+        self.__order = order[np.count_nonzero(codes < 0):]
+        self.__offsets = np.concatenate([[0], np.cumsum(np.bincount(codes[codes >= 0], minlength=len(uniques)))])
+        logger.debug(f'Indexed {len(self.names)} companies over {len(data)} rows')
+
+    def __repr__(self) -> str:
+        return f'CompanyIndex object\nCompanies: {len(self.names)}\nRows: {len(self.data)}'
+
+    def positions(self, companies: list) -> np.ndarray:
+        codes = self.names.get_indexer([company.lower() for company in companies])
+        codes = np.unique(codes[codes >= 0])
+        if not len(codes):
+            return np.array([], dtype='int64')
+        return np.sort(np.concatenate([self.__order[self.__offsets[code]:self.__offsets[code+1]] for code in codes]))
+
+    def select(self, companies: list) -> pd.DataFrame:
+        return self.data.iloc[self.positions(companies)]
+
+    def normalized(self, companies: list) -> pd.DataFrame:
+        positions = self.positions(companies)
+        rows = self.data.iloc[positions].copy()
+        rows[self.column] = self.names.to_numpy()[self.__codes[positions]]
+        return rows
@@ -0,0 +1,89 @@
+from __future__ import annotations
+import os
+import json
+import hashlib
+import logging
+from lazy_import import lazy_module
+
+
+logger = logging.getLogger(__name__)
+pd = lazy_module('pandas')
+
+
+class DataCache():
+    """
+    A binary on-disk cache of parsed DataFrames.
+
+    Each source file gets its own cache entry, its pickled datasets
+    (dtypes and categories are kept as is) plus a small JSON fingerprint
+    of the source path, mtime, size and the read options used to parse it.
+    An entry is only used when the fingerprint still matches, so changing
+    one source file only invalidates that file's entry.
+
+    Attributes
+    ----------
+    cache_dir: str
+        The directory the cache entries are written to
+
+    Public Methods
+    ----------
+    load(filepath, options):
+        Returns the cached datasets of filepath, or None if there is no
+        up to date entry
+    store(filepath, data, options):
+        Writes data as the cache entry of filepath
+    """
+    def __init__(self, cache_dir: str) -> None:
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        logger.debug(f'Initialized DataCache with cache directory: {self.cache_dir}')
+
+    def load(self, filepath: str, options: dict = None):
+        """
+        Reads the cached datasets of filepath if its fingerprint matches
+        """
+        entry = self.__entry(filepath)
+        try:
+            with open(entry + '.json', 'r') as fingerprint_file:
+                fingerprint = json.load(fingerprint_file)
+        except (OSError, ValueError):
+            return None
+        if fingerprint != self.__fingerprint(filepath, options):
+            logger.debug(f'Cache entry for {filepath} is out of date')
+            return None
+        try:
+            data = pd.read_pickle(entry + '.pkl')
+        except Exception as e:
+            logger.error(f'Error reading cache entry for {filepath}: {e}')
+            return None
+        logger.debug(f'Loaded {filepath} from cache')
+        return data
+
+    def store(self, filepath: str, data, options: dict = None) -> None:
+        """
+        Writes the datasets and then their fingerprint, each through a
+        temporary file so a reader never sees a partial entry.
+        """
+        entry = self.__entry(filepath)
+        pd.to_pickle(data, entry + '.pkl.tmp')
+        os.replace(entry + '.pkl.tmp', entry + '.pkl')
+        with open(entry + '.json.tmp', 'w') as fingerprint_file:
+            json.dump(self.__fingerprint(filepath, options), fingerprint_file)
+        os.replace(entry + '.json.tmp', entry + '.json')
+        logger.debug(f'Stored {filepath} in cache')
+
+    def __entry(self, filepath: str) -> str:
+        """
+        Cache entry path (without extension) of a source file
+        """
+        key = hashlib.sha1(os.path.abspath(filepath).encode()).hexdigest()
+        return os.path.join(self.cache_dir, key)
+
+    @staticmethod
+    def __fingerprint(filepath: str, options: dict) -> dict:
+        stat = os.stat(filepath)
+        return {'path': os.path.abspath(filepath),
+                'mtime': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'options': repr(options),
+                }
@@ -1,21 +1,75 @@
-import pandas as pd
+from __future__ import annotations
+import time
 import logging
 from os import path
-from read_data import ReadData
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from operator import itemgetter
+from read_data import ReadData, CsvChunks
+from layoff_aggregates import LayoffAggregates, FUSED_FUNCTIONS, EXCLUDED_STAGES
+from incremental import IncrementalLayoffs
+from scheduler import Scheduler, requires
+from instrumentation import profiled
+from chunked import ChunkedLayoffs, ChunkedSalaries
+from sharded import LayoffShards, ShardCoordinator
+from sketches import SketchLayoffs, SKETCH_FUNCTIONS
+from company_index import CompanyIndex
+from lazy_import import lazy_module
 
 
 # logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
-logging.getLogger().setLevel('INFO')
+pd = lazy_module('pandas')
+asyncio = lazy_module('asyncio')
+
+# Companies __company_comp_salaries compares by default
+TOP_COMPANIES = ['amazon','google','salesforce','philips','microsoft','dell','booking.com']
+# Company indexes built once per load, key is the node name, value is the dataset
+COMPANY_INDEXES = {'__salary_companies': 'salaries',
+                   '__layoff_companies': 'layoffs',
+                   }
 
 class ProcessData():
-    def __init__(self, data_directory: str) -> None:
+    def __init__(self, data_directory: str, fused: bool = False, incremental_state: str = None,
+                 workers: int = 1, profiler=None, companies: list = TOP_COMPANIES, shards: list = None,
+                 nodes: list = None, approximate: bool = False, sketch_options: dict = None,
+                 **read_options) -> None:
         self.data_directory = data_directory
+        # Files read and processing functions run concurrently
+        self.workers = workers
+        # Passed on to ReadData (cache_dir, compact, chunksize)
+        self.read_options = read_options
+        # Records every read and processing function call, see instrumentation.py
+        self.profiler = profiler
+        # Compute the groupby layoff functions in one pass (see layoff_aggregates.py)
+        self.fused = fused
+        # File of the aggregates persisted between runs, only new layoff rows
+        # are aggregated when it is set (see incremental.py)
+        self.incremental_state = incremental_state
+        # CSV partitions of the layoffs data, aggregated map/reduce style by
+        # the nodes (command prefixes, local processes by default) in place
+        # of the layoffs dataset (see sharded.py)
+        self.shards = shards
+        self.nodes = nodes
+        # Approximate __company_layoffs (top companies only) and the
+        # high_per functions with streaming sketches, sketch_options are
+        # passed on to SketchLayoffs (see sketches.py)
+        self.approximate = approximate
+        self.sketch_options = sketch_options or {}
+        # Companies compared by __company_comp_salaries, and the company
+        # indexes of the last run for comparing other companies later
+        self.companies = [company.lower() for company in companies]
+        self.company_indexes = {}
         self.data = {}
         self.processed = {}
+        # Per-function timings of the last run and its longest dependency chain
+        self.timings = {}
+        self.critical_path = []
         """
         ******
         Add your functions to the lists below
+        Functions take the layoffs (or salaries and layoffs) data unless they
+        declare their inputs with @requires, see scheduler.py
         ******
         """
         self.layoff_functions = [self.__industry_layoffs, 
@@ -28,6 +82,40 @@ class ProcessData():
                                  self.__sector_layoffs,
                                  ]
         self.salary_functions = [self.__company_comp_salaries]
+        self.employment_functions = [self.__industry_employment,
+                                     self.__employment_change,
+                                     self.__largest_job_losses,
+                                     ]
+        # Intermediate results shared by several functions, not part of the output.
+        # They should only filter rows, in chunked mode they run on each chunk
+        self.intermediate_functions = [self.__funded_companies]
+        # Outputs made of the results of a list of functions
+        self.function_outputs = {'layoff_processed': self.layoff_functions,
+                                 'salary_processed': self.salary_functions,
+                                 'employment_processed': self.employment_functions,
+                                 }
+        # Yearly Challenger tables, key is the output, value is the column
+        # used as index
+        self.yearly_tables = {'hiring': 'INDUSTRY',
+                              'reason': 'reason',
+                              }
+        # Output each dataset is processed into, key is a pattern of the
+        # dataset's file name (without its subdirectory), the first match
+        # wins. The functions of an output take the dataset under the
+        # pattern's name, a yearly table merges every matching dataset.
+        self.routes = {'layoffs': 'layoff_processed',
+                       'salaries': 'salary_processed',
+                       # California industry employment by month (EDD workbooks),
+                       # not seasonally adjusted and seasonally adjusted
+                       'CAL$HWS': 'employment_processed',
+                       'CAL$SHWS': 'employment_processed',
+                       '*_hiring': 'hiring',
+                       '*_reason': 'reason',
+                       }
+        # Inputs of the functions of the last run, key is the route pattern
+        self.sources = {}
+        # Files that won each duplicate year of the yearly tables
+        self.yearly_conflicts = {}
         logger.debug(f'Initialized ProcessData with data directory: {self.data_directory}')
 
     def __repr__(self) -> str:
@@ -37,164 +125,465 @@ class ProcessData():
         """
         Process the data and return a dictionary of processed data
         """
-        data_reader = ReadData(self.data_directory)
+        data_reader = ReadData(self.data_directory, workers=self.workers, profiler=self.profiler,
+                               patterns=self.__read_patterns(), **self.read_options)
         self.data = data_reader.process()
-        for data in self.data:
-            if data == 'layoffs':
-                self.processed['layoff_processed'] = self.__process_layoffs(self.data[data])
-            elif data == 'salaries':
-                self.processed['salary_processed'] = self.__process_salary(self.data['salaries'],self.data['layoffs'])
-            elif 'hiring' in data:
-                self.__process_yearly(input_df=self.data[data],
-                                      output_df='hiring',
-                                      df_index='INDUSTRY',)
-            elif 'reason' in data:
-                self.__process_yearly(input_df=self.data[data],
-                                      output_df='reason',
-                                      df_index='reason',)
+        routed = self.__route(self.data)
+        self.sources = {}
+        for name, pattern in routed.items():
+            if self.routes[pattern] in self.function_outputs:
+                if pattern in self.sources:
+                    logger.warning(f'{name} is also routed to {pattern}, using the first one')
+                    continue
+                self.sources[pattern] = self.data[name]
+        if self.shards:
+            self.sources['layoffs'] = LayoffShards(self.shards)
+        results = self.__process_functions(self.sources)
+        for output_df, functions in self.function_outputs.items():
+            # Outputs none of whose functions ran (e.g. their inputs are not sharded) are left out
+            outputs = {func.__name__: results[func.__name__] for func in functions if func.__name__ in results}
+            if outputs:
+                self.processed[output_df] = outputs
+        for output_df, df_index in self.yearly_tables.items():
+            inputs = {name: self.data[name] for name, pattern in routed.items() if self.routes[pattern] == output_df}
+            if inputs:
+                self.processed[output_df] = profiled(self.profiler, 'yearly', output_df, self.__process_yearly,
+                                                     inputs, output_df, df_index)
         return self.processed
+
+    async def process_async(self, max_resident: int = 4) -> dict:
+        """
+        process() as an asyncio pipeline, see stream()
+        """
+        async for _ in self.stream(max_resident):
+            pass
+        return self.processed
+
+    async def stream(self, max_resident: int = 4):
+        """
+        Asynchronous pipeline version of process(), yields an
+        (output_df, name, result) tuple as soon as each result is ready
+        (name is None for the yearly tables).
+
+        Every file is read on a reading pool and its datasets are routed
+        as soon as it is loaded, and every function runs on a processing
+        pool as soon as its inputs are, so reads and processing overlap.
+        The layoffs are read first, then the other function inputs, the
+        largest first. A file holds one of max_resident slots from the
+        start of its read until none of its datasets has a function that
+        is running or could run on what is loaded, so at most
+        max_resident files are read ahead of processing (datasets waiting
+        for other files, like the yearly tables, don't hold a slot).
+        self.processed gets the same dictionary as process() returns,
+        self.data is not kept.
+        """
+        loop = asyncio.get_running_loop()
+        data_reader = ReadData(self.data_directory, workers=self.workers, profiler=self.profiler,
+                               patterns=self.__read_patterns(), **self.read_options)
+        filepaths = data_reader.discover()
+        names = {data_reader.dataset_name(filepath): filepath for filepath in filepaths}
+        expected = {}
+        winners = {}
+        for name, pattern in self.__route(names).items():
+            expected[names[name]] = pattern
+            if self.routes[pattern] in self.function_outputs:
+                winners.setdefault(pattern, name)
+        winner_files = {names[name] for name in winners.values()}
+        filepaths.sort(key=lambda filepath: (expected.get(filepath) != 'layoffs', filepath not in winner_files,
+                                             -data_reader.fingerprints[filepath][1]))
+        layoffs_file = next((filepath for filepath, pattern in expected.items() if pattern == 'layoffs'), None)
+        waiting = {output_df: {filepath for filepath, pattern in expected.items() if self.routes[pattern] == output_df}
+                   for output_df in self.yearly_tables}
+        yearly_inputs = {output_df: {} for output_df in self.yearly_tables}
+        reported = {func.__name__: output_df for output_df, functions in self.function_outputs.items()
+                    for func in functions}
+        self.data = {}
+        self.sources = {'layoffs': LayoffShards(self.shards)} if self.shards else {}
+        processed = {}
+        available = dict(self.sources)
+        scheduler = None
+        started = set()
+        holders = {}
+        slots = asyncio.Semaphore(max_resident)
+        run_start = time.perf_counter()
+
+        async def read(filepath: str) -> dict:
+            await slots.acquire()
+            return await loop.run_in_executor(reading, data_reader.load, filepath)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as reading, \
+             ThreadPoolExecutor(max_workers=self.workers) as processing:
+            tasks = {asyncio.ensure_future(read(filepath)): ('read', filepath) for filepath in filepaths}
+            try:
+                while tasks:
+                    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        kind, key = tasks.pop(task)
+                        if kind == 'read':
+                            holders[key] = self.__stream_route(key, task.result(), winners, yearly_inputs, available)
+                            for output_df, pending in waiting.items():
+                                pending.discard(key)
+                                if not pending and output_df in yearly_inputs and yearly_inputs[output_df]:
+                                    inputs = dict(sorted(yearly_inputs.pop(output_df).items()))
+                                    yearly = loop.run_in_executor(processing, profiled, self.profiler, 'yearly', output_df,
+                                                                  self.__process_yearly, inputs, output_df,
+                                                                  self.yearly_tables[output_df])
+                                    tasks[yearly] = ('yearly', output_df)
+                            if key == layoffs_file:
+                                layoffs_file = None
+                        elif kind == 'node':
+                            available[key] = task.result()
+                            if key in reported:
+                                processed.setdefault(reported[key], {})[key] = available[key]
+                                yield reported[key], key, available[key]
+                        else:
+                            processed[key] = task.result()
+                            yield key, None, processed[key]
+                    if scheduler is None and layoffs_file is None:
+                        preview = {pattern: None for pattern in winners}
+                        preview.update(self.sources)
+                        scheduler = self.__build_scheduler(preview)
+                    if scheduler is not None:
+                        for name in scheduler.ready(available, started):
+                            started.add(name)
+                            inputs = {i: available[i] for i in scheduler.nodes[name][1]}
+                            tasks[loop.run_in_executor(processing, scheduler.call, name, inputs, run_start)] = ('node', name)
+                        live = [name for name in scheduler.reachable(available) if name not in available]
+                        for filepath, patterns in list(holders.items()):
+                            if not any(pattern in scheduler.nodes[name][1] for name in live for pattern in patterns):
+                                del holders[filepath]
+                                slots.release()
+            finally:
+                for task in tasks:
+                    task.cancel()
+        if scheduler is not None:
+            self.company_indexes = {name: available[name] for name in COMPANY_INDEXES if name in available}
+            self.timings = scheduler.timings
+            self.critical_path = scheduler.critical_path()
+        for output_df, functions in self.function_outputs.items():
+            outputs = {func.__name__: processed[output_df][func.__name__] for func in functions
+                       if func.__name__ in processed.get(output_df, {})}
+            if outputs:
+                self.processed[output_df] = outputs
+        self.processed.update({output_df: processed[output_df] for output_df in self.yearly_tables if output_df in processed})
+        logger.debug(f'Streamed {len(filepaths)} files in {time.perf_counter() - run_start:.4f} s')
+
+    def __stream_route(self, filepath: str, datasets: dict, winners: dict, yearly_inputs: dict, available: dict) -> set:
+        """
+        Routes the datasets of a file loaded by stream(), returns the
+        function inputs it provides
+        """
+        patterns = set()
+        for name, pattern in self.__route(datasets).items():
+            output_df = self.routes[pattern]
+            if output_df in self.yearly_tables:
+                if output_df in yearly_inputs:
+                    yearly_inputs[output_df][name] = datasets[name]
+                else:
+                    logger.warning(f'{name} loaded after {output_df} was merged, skipped')
+            elif winners.get(pattern, name) != name or pattern in self.sources:
+                logger.warning(f'{name} is also routed to {pattern}, using the first one')
+            else:
+                self.sources[pattern] = available[pattern] = datasets[name]
+                patterns.add(pattern)
+        logger.debug(f'Loaded {filepath}: {", ".join(datasets) or "no datasets"}')
+        return patterns
     
-    def __process_yearly(self, input_df: pd.DataFrame, output_df:str, df_index:str) -> None:
+    def __read_patterns(self) -> tuple:
+        """
+        Route patterns of the files to read, the shards stand for the
+        layoffs file
+        """
+        return tuple(pattern for pattern in self.routes if not (self.shards and pattern == 'layoffs'))
+
+    def __route(self, datasets: dict) -> dict:
+        """
+        Route pattern of each dataset that has one, the datasets closest
+        to the data directory first
+        """
+        routed = {}
+        for name in sorted(datasets, key=lambda name: (name.count('/'), name)):
+            file_name = name.rsplit('/', 1)[-1]
+            pattern = next((pattern for pattern in self.routes if fnmatchcase(file_name, pattern)), None)
+            if pattern is None:
+                logger.debug(f'No processor for {name}')
+            else:
+                routed[name] = pattern
+        return routed
+
+    def __process_yearly(self, inputs: dict, output_df:str, df_index:str) -> pd.DataFrame:
         """
-        Takes Dataframes containing data with numeric columns and adds
-        the data to a specified dataframe.
-        Columns without a numeric label are dropped.
-        Data values should be able to convert into numbers and
-        the entries in the output dataframe will have type int.
+        Takes Dataframes containing data with numeric columns and merges
+        them into a single dataframe with one int column per year.
+        Columns without a numeric label are dropped (the Challenger
+        tables come from read_data.read_challenger with int year labels
+        and int64 counts, see challenger_csv.py).
+        The entries in the output dataframe will have type int.
+        When several inputs have the same year, the input with the most
+        recent year (the newest report) wins, ties go to the input whose
+        name sorts last. Each conflict is logged and kept in
+        self.yearly_conflicts.
 
         Attributes
         ----------
-        input_df:
-            input dataframe
+        inputs: dict
+            key is the dataset name, value is the input dataframe
         output_df: str
-            Name of dataframe to add to.
+            Name of the output dataframe.
         df_index: str
             input dataframe column to be used as index
         """
-        input_df = input_df.set_index(df_index)
-        for column in input_df.columns:
-            try:
-                input_df = input_df.rename(columns={column:int(column)})
-            except ValueError:
-                logger.debug(f'{column} is not a Year column')
-                input_df = input_df.drop(columns=column)
-        self.__outer_join(input_df=input_df,new_df=output_df)
-
-    def __outer_join(self, input_df: pd.DataFrame, new_df:str) -> None:
-        """
-        Outer join on index to processed dataframes.
-        Data values should be able to convert into numbers and
-        the entries in the output dataframe values will have type int.
-        If the dataframe being joined to does not exist, 'right' 
-        dataframe gets added as a new entry.
-        """
-        try:
-            self.processed[new_df] = self.processed[new_df].join(input_df,how='outer',rsuffix='_dupl').fillna(0)    
-            self.processed[new_df] = (self.processed[new_df].drop(self.processed[new_df].filter(regex='_dupl$').columns, axis=1).astype(int))
-            for column in self.processed[new_df].columns:
-                self.processed[new_df] = self.processed[new_df].rename(columns={column:int(column)})
-        except KeyError:
-            self.processed[new_df] = input_df
-
-    def __process_layoffs(self, data: pd.DataFrame) -> dict:
-        """
-        Call all the functions in self.layoff_functions and return a dictionary of results
-        """
-        logger.debug('Processing layoffs data')
-        results = {}
-        for func in self.layoff_functions:
-            result = func(data)
-            results[func.__name__] = result
+        frames = {}
+        for name, input_df in inputs.items():
+            input_df = input_df.set_index(df_index)
+            years = pd.to_numeric(input_df.columns, errors='coerce')
+            if years.isna().any():
+                logger.debug(f'{list(input_df.columns[years.isna()])} are not Year columns')
+            input_df = input_df.loc[:, years.notna()]
+            input_df.columns = years[years.notna()].astype(int)
+            frames[name] = input_df
+        priority = sorted(frames, key=lambda name: (frames[name].columns.max(), name), reverse=True)
+        owners = {}
+        for name in priority:
+            for year in frames[name].columns:
+                owners.setdefault(year, []).append(name)
+        self.yearly_conflicts[output_df] = {year: {'winner': names[0], 'losers': names[1:]}
+                                            for year, names in owners.items() if len(names) > 1}
+        for year, conflict in self.yearly_conflicts[output_df].items():
+            logger.info(f'{output_df} {year}: using {conflict["winner"]} over {", ".join(conflict["losers"])}')
+        pieces = [frames[name][[year for year in frames[name].columns if owners[year][0] == name]]
+                  for name in priority]
+        merged = pd.concat(pieces, axis=1, join='outer').fillna(0).astype(int)
+        return merged.sort_index().sort_index(axis=1)
+
+    def __process_functions(self, datasets: dict) -> dict:
+        """
+        Run the intermediate, layoff, salary and employment functions as one dependency
+        graph and return a dictionary of results, key is the function name.
+        """
+        scheduler = self.__build_scheduler(datasets)
+        results = scheduler.run(datasets)
+        self.company_indexes = {name: results[name] for name in COMPANY_INDEXES if name in results}
+        self.timings = scheduler.timings
+        self.critical_path = scheduler.critical_path()
         return results
-        
-    def __process_salary(self, data_salary: pd.DataFrame, data_layoff: pd.DataFrame) -> dict:
+
+    def __build_scheduler(self, datasets: dict) -> Scheduler:
         """
-        Call all the functions in self.salary_functions and return a dictionary of results
+        The dependency graph of the functions for the given datasets.
+        When the layoffs data is read in chunks (ReadData chunksize) the
+        layoffs are streamed once through ChunkedLayoffs, and functions
+        that need the whole data in memory are skipped. When the layoffs
+        are shards, only the fused layoff functions run, on the aggregates
+        the ShardCoordinator reduces. In approximate mode the functions in
+        SKETCH_FUNCTIONS come from one SketchLayoffs pass instead.
         """
-        logger.debug('Processing salary data')
-        results = {}
+        logger.debug('Processing layoffs and salary data')
+        chunked = isinstance(datasets.get('layoffs'), CsvChunks)
+        sharded = isinstance(datasets.get('layoffs'), LayoffShards)
+        if (chunked or sharded) and self.incremental_state:
+            raise ValueError('Incremental processing needs the whole layoffs data, not chunks or shards')
+        fused = self.fused or self.incremental_state or chunked or sharded
+        fused_node = '__chunked_layoffs' if chunked else '__sharded_layoffs' if sharded else '__fused_layoffs'
+        scheduler = Scheduler(workers=self.workers, profiler=self.profiler)
+        for func in self.intermediate_functions:
+            if chunked:
+                scheduler.add(func.__name__, itemgetter(func.__name__), [fused_node])
+            elif not sharded:
+                scheduler.add(func.__name__, func, getattr(func, 'requires', ['layoffs']))
+        sketched = self.approximate and not sharded
+        for func in self.layoff_functions:
+            inputs = getattr(func, 'requires', ['layoffs'])
+            if sketched and func.__name__ in SKETCH_FUNCTIONS:
+                scheduler.add(func.__name__, itemgetter(func.__name__), ['__sketch_layoffs'])
+            elif chunked and 'layoffs' not in inputs:
+                # Runs as usual on the (concatenated) intermediate results
+                scheduler.add(func.__name__, func, inputs)
+            elif fused and func.__name__ in FUSED_FUNCTIONS:
+                scheduler.add(func.__name__, itemgetter(func.__name__), [fused_node])
+            elif chunked or sharded:
+                logger.warning(f'{func.__name__} needs the whole layoffs data, skipped in {"chunked" if chunked else "sharded"} mode')
+            else:
+                scheduler.add(func.__name__, func, inputs)
         for func in self.salary_functions:
-            result = func([data_salary,data_layoff])
-            results[func.__name__] = result
-        return results
-    
+            if chunked and func.__name__ == '__company_comp_salaries':
+                scheduler.add(func.__name__, self.__chunked_comp_salaries, ['salaries', fused_node])
+            elif chunked:
+                logger.warning(f'{func.__name__} needs the whole salaries data, skipped in chunked mode')
+            elif sharded and 'salaries' in datasets:
+                logger.warning(f'{func.__name__} needs the layoff rows, skipped in sharded mode')
+            else:
+                scheduler.add(func.__name__, func, getattr(func, 'requires', ['salaries', 'layoffs']))
+        for func in self.employment_functions:
+            scheduler.add(func.__name__, func, func.requires)
+        if chunked:
+            scheduler.add(fused_node, ChunkedLayoffs(self.intermediate_functions, self.companies).process, ['layoffs'])
+        elif sharded:
+            scheduler.add(fused_node, ShardCoordinator(self.nodes, self.workers).process, ['layoffs'])
+        elif all(dataset in datasets for dataset in COMPANY_INDEXES.values()) and \
+                any(set(COMPANY_INDEXES) & set(inputs) for _, inputs in scheduler.nodes.values()):
+            # Only built when a function looks companies up in them
+            for name, dataset in COMPANY_INDEXES.items():
+                scheduler.add(name, CompanyIndex, [dataset])
+        if sketched:
+            scheduler.add('__sketch_layoffs', SketchLayoffs(**self.sketch_options).process, ['layoffs'])
+        if fused and not chunked and not sharded:
+            scheduler.add(fused_node, self.__fused_layoffs, ['layoffs'])
+        return scheduler
+
+    def __fused_layoffs(self, data: pd.DataFrame) -> dict:
+        """
+        Results of every fused layoff function, computed in one pass
+        (and only over new rows in incremental mode)
+        """
+        if self.incremental_state:
+            tracker = IncrementalLayoffs(self.incremental_state)
+            results = tracker.update(data).results()
+            tracker.save()
+            return results
+        return LayoffAggregates.from_frame(data).results()
+
+    def __chunked_comp_salaries(self, data) -> pd.DataFrame:
+        """
+        __company_comp_salaries on the salaries chunks and the company
+        rows kept while streaming the layoffs
+        """
+        average_compensation = ChunkedSalaries(self.companies).process(data[0])
+        return self.__join_company_layoffs(average_compensation, data[1]['__company_rows'], self.companies)
+
+    def company_comp_salaries(self, companies: list) -> pd.DataFrame:
+        """
+        Average compensation and layoffs of any set of companies, looked
+        up in the company indexes of the last process() run
+        """
+        if set(self.company_indexes) != set(COMPANY_INDEXES):
+            raise ValueError('Needs a process() run over in-memory salaries and layoffs data first')
+        return self.__comp_salaries([company.lower() for company in companies],
+                                    self.company_indexes['__salary_companies'],
+                                    self.company_indexes['__layoff_companies'])
+
     # Processing Functions
     @staticmethod
     def __industry_layoffs(data) -> pd.DataFrame:
         industry: pd.DataFrame = data[['industry', 'total_laid_off']]
-        industry = industry.groupby('industry').sum().sort_values(by='total_laid_off', ascending=False)
+        industry = industry.groupby('industry', observed=True).sum().sort_values(by='total_laid_off', ascending=False)
         return industry
     
     @staticmethod
     def __sector_layoffs(data) -> pd.DataFrame:
-        sector = data.groupby('industry')['total_laid_off'].mean()
+        sector = data.groupby('industry', observed=True)['total_laid_off'].mean()
         return sector
     
     @staticmethod
     def __country_layoffs(data) -> pd.DataFrame:
         country: pd.DataFrame = data[['country', 'total_laid_off']]
-        country = country.groupby('country').sum().sort_values(by='total_laid_off', ascending=False)
+        country = country.groupby('country', observed=True).sum().sort_values(by='total_laid_off', ascending=False)
         return country
     
     @staticmethod
     def __sector_layoffs(data) -> pd.DataFrame:
-        sector = data.groupby('industry')['total_laid_off'].mean()
+        sector = data.groupby('industry', observed=True)['total_laid_off'].mean()
         return sector
 
     @staticmethod
     def __company_layoffs(data) -> pd.DataFrame:
         company: pd.DataFrame = data[['company', 'total_laid_off']]
-        company = company.groupby('company').sum().sort_values(by='total_laid_off', ascending=False)
+        company = company.groupby('company', observed=True).sum().sort_values(by='total_laid_off', ascending=False)
         return company
 
+    @requires('__salary_companies', '__layoff_companies')
+    def __company_comp_salaries(self, indexes) -> pd.DataFrame:
+        return self.__comp_salaries(self.companies, *indexes)
+
     @staticmethod
-    def __company_comp_salaries(data) -> pd.DataFrame:
-        list_top_companies = ['amazon','google','salesforce','philips','microsoft','dell','booking.com']
-        # Processing Compensation for Top Companies
-        companies: pd.DataFrame = data[0][['company', 'totalyearlycompensation']].reset_index()
-        companies.company = companies.company.str.lower()
-        top_companies = companies.loc[companies['company'].isin(list_top_companies)]
-        average_compensation = top_companies.groupby(['company']).mean().astype(int).reset_index()
+    def __comp_salaries(companies: list, salary_index: CompanyIndex, layoff_index: CompanyIndex) -> pd.DataFrame:
+        # Processing Compensation for Top Companies, only their rows are
+        # looked up, already lowercased by the index
+        top_companies: pd.DataFrame = salary_index.normalized(companies)[['company', 'totalyearlycompensation']].reset_index()
+        average_compensation = top_companies.groupby(['company'], observed=True).mean().astype(int).reset_index()
+        return ProcessData.__join_company_layoffs(average_compensation, layoff_index.select(companies), companies)
+
+    @staticmethod
+    def __join_company_layoffs(average_compensation: pd.DataFrame, layoffs: pd.DataFrame, companies: list) -> pd.DataFrame:
         # Processing Layoffs for Top Companies
-        company_layoffs : pd.DataFrame = data[1][['company','percentage_laid_off']]
-        company_layoffs = company_layoffs.loc[company_layoffs['percentage_laid_off']>0].groupby('company').sum().sort_values(by='percentage_laid_off', ascending=False).reset_index()
+        company_layoffs : pd.DataFrame = layoffs[['company','percentage_laid_off']]
+        company_layoffs = company_layoffs.loc[company_layoffs['percentage_laid_off']>0].groupby('company', observed=True).sum().sort_values(by='percentage_laid_off', ascending=False).reset_index()
         company_layoffs.company = company_layoffs.company.str.lower()
-        top_companies_layoffs = company_layoffs.loc[company_layoffs['company'].isin(list_top_companies)].sort_values(by='company',ascending=True)
+        top_companies_layoffs = company_layoffs.loc[company_layoffs['company'].isin(companies)].sort_values(by='company',ascending=True)
         top_companies_layoffs['percentage_laid_off'] = 100*top_companies_layoffs['percentage_laid_off']
         total_comp_layoffs = pd.merge(top_companies_layoffs, average_compensation,on='company').sort_values(by='totalyearlycompensation',ascending=False)
         return total_comp_layoffs
     
     @staticmethod
-    def __company_funding_stage(data) -> pd.DataFrame:
+    def __funded_companies(data) -> pd.DataFrame:
         funds: pd.DataFrame = data[['company', 'stage', 'funds_raised', 'total_laid_off']]
-        funds = funds[~funds['stage'].isin(['Post-IPO', 'Acquired', 'Unknown', 'Private Equity', 'Subsidiary'])]
+        funds = funds[~funds['stage'].isin(EXCLUDED_STAGES)]
+        return funds
+
+    @staticmethod
+    @requires('__funded_companies')
+    def __company_funding_stage(funds) -> pd.DataFrame:
         # pandas wants .mean(numeric_only=True) for this
         # are all the values being grouped numeric?
-        stage_data = funds.groupby('stage').mean().sort_values(by='total_laid_off', ascending=False)
+        stage_data = funds.groupby('stage', observed=True).mean().sort_values(by='total_laid_off', ascending=False)
         stage_data['Funds raised per Layoff'] = stage_data['funds_raised'].div(stage_data['total_laid_off'])
         return stage_data
     
     @staticmethod
-    def __company_funding_raised(data) -> pd.DataFrame:
-        funds: pd.DataFrame = data[['company', 'stage', 'funds_raised', 'total_laid_off']]
-        funds = funds[~funds['stage'].isin(['Post-IPO', 'Acquired', 'Unknown', 'Private Equity', 'Subsidiary'])]
+    @requires('__funded_companies')
+    def __company_funding_raised(funds) -> pd.DataFrame:
         return funds[['funds_raised', 'total_laid_off']]
     
     @staticmethod
     def __high_per_industry(data) -> pd.DataFrame:
-        per_industry = data.loc[data['percentage_laid_off']>0.2].loc[data['industry']!='Other'].groupby('industry')['company'].count().sort_values(ascending=False)[:10]
+        per_industry = data.loc[data['percentage_laid_off']>0.2].loc[data['industry']!='Other'].groupby('industry', observed=True)['company'].count().sort_values(ascending=False)[:10]
         per_industry = pd.DataFrame(per_industry).rename(columns={'company':'number of companies'})
         return per_industry
     
     @staticmethod
     def __high_per_country(data) -> pd.DataFrame:
-        per_country = data.loc[data['percentage_laid_off']>0.2].groupby('country')['company'].count().sort_values(ascending=False)
+        per_country = data.loc[data['percentage_laid_off']>0.2].groupby('country', observed=True)['company'].count().sort_values(ascending=False)
         per_country = pd.concat([per_country[:5], pd.Series({'Other Countries' : per_country[5:].sum()})])
         per_country = pd.DataFrame(per_country).rename(columns={0:'number of companies'})
         return per_country
+
+    @staticmethod
+    @requires('CAL$HWS')
+    def __industry_employment(data) -> pd.DataFrame:
+        return ProcessData.__employment_table(data)
+
+    @staticmethod
+    @requires('CAL$SHWS')
+    def __employment_change(data) -> pd.DataFrame:
+        # Jobs gained (lost when negative) since the previous month
+        return ProcessData.__employment_table(data).diff().iloc[1:].astype(int)
+
+    @staticmethod
+    @requires('CAL$SHWS')
+    def __largest_job_losses(data) -> pd.DataFrame:
+        change = ProcessData.__employment_table(data, totals=False).diff().iloc[1:].stack()
+        losses = change.nsmallest(10).astype(int).rename('change').reset_index()
+        return losses
+
+    @staticmethod
+    def __employment_table(data, totals: bool = True) -> pd.DataFrame:
+        # One column per industry (the XX-000000 series, e.g. Information),
+        # one row per month. The notes below the table have no SORTORDER,
+        # and the 0X- series are totals (Total Nonfarm, Goods Producing...)
+        rows = data.loc[pd.to_numeric(data['SORTORDER'], errors='coerce').notna()]
+        rows = rows.loc[rows['SS-NAICS'].str.endswith('-000000')]
+        if not totals:
+            rows = rows.loc[~rows['SS-NAICS'].str.startswith('0')]
+        rows = rows.set_index(rows['TITLE'].str.strip())
+        months = pd.to_datetime(rows.columns, errors='coerce')
+        employment = rows.loc[:, months.notna()].T.astype(int)
+        employment.index = pd.DatetimeIndex(months[months.notna()], name='month')
+        employment.columns.name = 'industry'
+        return employment
     
 
 if __name__ == '__main__':
+    logging.getLogger().setLevel('INFO')
     data_directory = 'data'
     # data_directory = 'data/challenger_data'
     data_processor = ProcessData(data_directory)
@@ -1,37 +1,70 @@
+# Figures of the processed layoff and Challenger data.
+#
+# Every figure is a function registered with @figure, taking the
+# processed aggregates it plots and returning a matplotlib Figure.
+#
+# Usage:
+#   python data_viz.py
+#       shows every figure and the reasons animation (like the notebook)
+#   python data_viz.py --render plots [--format png svg] [--workers N] [--force]
+#       renders every figure headless (Agg backend) on a process pool,
+#       skipping figures whose inputs and code haven't changed
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
 import pandas as pd
 import numpy as np
 import logging
 import matplotlib.pyplot as plt
-import matplotlib.animation as ani
 import matplotlib.colors as mcolors
+from concurrent.futures import ProcessPoolExecutor
 from matplotlib import dates, rcParams, cycler
 from matplotlib.ticker import FuncFormatter, ScalarFormatter
 from data_processing import ProcessData
+from line_animation import LineAnimation
 
-# shh...
-logging.getLogger().setLevel('INFO')
 
-# dark theme
-plt.style.use('dark_background')
+logger = logging.getLogger(__name__)
 
 # Set the default styles
 color = ['#e84118', 'orange', 'purple', 'green', 'blue', 'gray', 'yellow', 'red', 'cyan', 'magenta', 'black', 'white', 'pink', 'brown',]
-rcParams.update({'axes.prop_cycle':     cycler(color=color),
-                'savefig.facecolor':   '1a1d24',
-                'figure.facecolor':    '1a1d24',
-                'axes.facecolor':      '2f3440',
-                'figure.dpi':          150,
-                'font.size':           12,
-                })
-
-data_directory = 'data'
-data_processor = ProcessData(data_directory)
-data = data_processor.process()
+STYLE = {'axes.prop_cycle':     cycler(color=color),
+         'savefig.facecolor':   '1a1d24',
+         'figure.facecolor':    '1a1d24',
+         'axes.facecolor':      '2f3440',
+         'figure.dpi':          150,
+         'font.size':           12,
+         }
+# Colours of the reasons curves
+REASON_COLORS = ['#e84118', 'orange', 'purple', 'green', 'gray', 'yellow', 'red', 'cyan', 'magenta', 'black', 'white', 'pink', 'brown',]
+# Rendered figures and the hash of their inputs, kept in the output directory
+MANIFEST = '.rendered.json'
+
+# Registered figures, key is the output file name, value is the figure
+# function and the (group, name) keys of the processed data it plots
+FIGURES = {}
+
+
+def figure(name: str, *inputs: tuple):
+    """
+    Registers a figure function under the name of its output file. inputs
+    are the keys of the processed data passed to it, e.g.
+    ('layoff_processed', '__sector_layoffs') or ('challenger', 'reason').
+    """
+    def decorator(func):
+        FIGURES[name] = (func, inputs)
+        return func
+    return decorator
+
+
+def apply_style() -> None:
+    # dark theme
+    plt.style.use('dark_background')
+    rcParams.update(STYLE)
 
-# Funding Plots
-funding_data: pd.DataFrame = data['layoff_processed']['__company_funding_stage']
-funding_raised_layoffs: pd.DataFrame = data['layoff_processed']['__company_funding_raised']
-funding_raised_layoffs.dropna(inplace=True)
 
 def currency_mil(x, pos):
     """
@@ -51,85 +84,6 @@ def currency_mil(x, pos):
     return s
 
 
-# Funds raised per Layoff by Stage
-fig, ax = plt.subplots(figsize=(10, 5),constrained_layout=True)
-plt.bar(funding_data.index, funding_data['Funds raised per Layoff'])
-ax.get_yaxis().set_major_formatter(FuncFormatter(currency_mil))
-plt.xlabel('Stage of Funding')
-plt.ylabel('Funds raised per Layoff')
-plt.title('Funds raised per Layoff by Stage of Funding')
-plt.xticks(rotation=45, ha="right", rotation_mode="anchor")
-plt.show()
-
-# Stage of Funding versus average layoffs
-fig = plt.figure(figsize=(10, 5),constrained_layout=True)
-plt.bar(funding_data.index, funding_data['total_laid_off'])
-plt.xlabel('Stage of Funding')
-plt.ylabel('Average Layoffs')
-plt.title('Average Layoffs by Stage of Funding')
-plt.xticks(rotation=45, ha="right", rotation_mode="anchor")
-plt.show()
-
-# Layoffs versus Funds Raised
-fig, ax = plt.subplots(figsize=(10, 6),constrained_layout=True)
-plt.scatter(funding_raised_layoffs['funds_raised'], funding_raised_layoffs['total_laid_off'])
-plt.xlabel('Funds Raised')
-plt.ylabel('Layoffs')
-plt.xscale('log')
-plt.yscale('log')
-ax.get_xaxis().set_major_formatter(FuncFormatter(currency_mil))
-# ax.get_xaxis().set_major_formatter(FuncFormatter(lambda x, loc: "${:,.0f}".format(float(x) * 1e6)))
-ax.get_yaxis().set_major_formatter(ScalarFormatter())
-plt.xticks(rotation=45, ha="right", rotation_mode="anchor")
-plt.title('Layoffs versus Funds Raised')
-plt.xticks(rotation=45, ha="right", rotation_mode="anchor")
-plt.show()
-
-# Sector wise lay-offs in each industry
-sector = data['layoff_processed']['__sector_layoffs']
-fig = plt.figure(figsize=(13, 5),constrained_layout=True)
-# plt.bar(sector.index, sector['number of companies'], width=0.8)
-sector.plot(kind='bar',width = 0.8)
-plt.xlabel('Sector')
-plt.ylabel('Number of layoffs')
-plt.title('Sector-wise Layoffs (2020 - 2022 Feb)')
-plt.xticks(rotation=45, ha="right", rotation_mode="anchor")
-plt.show()
-
-
-
-# Number of companies having >20% layoff in each industry
-high_per_industry = data['layoff_processed']['__high_per_industry']
-fig = plt.figure(figsize=(13, 5),constrained_layout=True)
-plt.bar(high_per_industry.index, high_per_industry['number of companies'], width=0.8)
-plt.xlabel('Industry')
-plt.ylabel('Number of Companies')
-plt.title('Number of Companies Having 20% or Higher Layoffs by Industry')
-plt.xticks(rotation=45, ha="right", rotation_mode="anchor")
-plt.show()
-
-
-# Number of companies having >20% layoff in each country
-high_per_country = data['layoff_processed']['__high_per_country']
-fig = plt.figure(figsize=(13, 5),constrained_layout=True)
-plt.bar(high_per_country.index, high_per_country['number of companies'], width=0.8)
-plt.xlabel('Country')
-plt.ylabel('Number of Companies')
-plt.title('Number of Companies Having 20% or Higher Layoffs by Country')
-plt.xticks(rotation=45, ha="right", rotation_mode="anchor")
-plt.show()
-
-fig, ax = plt.subplots(figsize=(10, 5),constrained_layout=True)
-
-ax.pie(high_per_country['number of companies'], labels=high_per_country.index, autopct='%1.1f%%', startangle=90)
-plt.show()
-
-high_per_country = data['layoff_processed']['__high_per_country']
-data['layoff_processed']['__high_per_country']
-
-# Takes a minute to save
-save_gif=False
-
 # Number formatter from https://learndataanalysis.org/source-code-format-axis-label-to-thousands-and-millions-suffix-matplotlib-tutorial/
 def format_number(data_value, indx):
     if data_value >= 1e6:
@@ -140,100 +94,331 @@ def format_number(data_value, indx):
         formatter = '{:1.0f}'.format(data_value)
     return formatter
 
-challenger_data = ProcessData('data/challenger_data')
-challenger_data = challenger_data.process()
-# print(reason_data['reason'].sort_values(by=[max(reason_data['reason'])],ascending=False))
-to_plot_reason=(challenger_data['reason']
-         .sort_values(by=[max(challenger_data['reason'])],ascending=False)
-         .iloc[0:5].transpose()
-        #  .reset_index().set_index('index')
-         .sort_index(ascending=False)
-         )
-# print(to_plot_reason)
-
-p_legend=[to_plot_reason.columns[i].replace('_',' ') + ': ' + str(to_plot_reason.iloc[0,i]) for i in range(len(to_plot_reason.columns))]
-# print(p_legend)
-
-# Year converts to YYYY/Jan/1, however the data is for the end of year.
-to_plot_reason.index=pd.to_datetime(to_plot_reason.index,format='%Y')
-
-# interpolate for smooth curve in plot
-to_plot_reason=to_plot_reason.reindex(pd.date_range(min(to_plot_reason.index),pd.to_datetime('jan 2, 2022'),freq="D"))
-# so that endpoints of the plot are the values for 2022
-to_plot_reason.iloc[-1]=to_plot_reason.iloc[-2] 
-# Spline method drastically overshoots the data points
-to_plot_reason=to_plot_reason.interpolate(method='polynomial',order=2)
-to_plot_reason=to_plot_reason.reindex(pd.date_range(min(to_plot_reason.index),max(to_plot_reason.index),freq="37D"))
-
-# Plot parameters
-fig, ax = plt.subplots(constrained_layout=True)
-plt.xticks(rotation=45, ha="right", rotation_mode="anchor") #rotate the x-axis values
-ax.yaxis.set_major_formatter(format_number)
-ax.xaxis.set_major_formatter(dates.DateFormatter('%Y'))
-plt.ylabel('Number of cuts Per Year')
-plt.xlabel('Year')
-plt.title('Top 5 Reasons for Job Termination at the end of 2022')
-
-# Plot builder for animation
-def build_line_chart(i=int):
-    color = ['#e84118', 'orange', 'purple', 'green', 'gray', 'yellow', 'red', 'cyan', 'magenta', 'black', 'white', 'pink', 'brown',]
-    plt.legend(p_legend, loc='upper left')
-    p = plt.plot(to_plot_reason[:i].index, to_plot_reason[:i].values) #note it only returns the dataset, up to the point i
-    for i in range(5):
-        p[i].set_color(color[i]) #set the colour of each curve
-
-
-
-# animator.save takes a bit of time
-animator = ani.FuncAnimation(fig, build_line_chart, interval = 10)
-plt.ylim([0, 200000])
-if save_gif:
-    # PillowWriter doesn't control loop count yet. Have to modify externally
-    # because  looping makes this plot useless.
-    animator.save('plots/reasons.gif', dpi=300, writer=ani.PillowWriter(fps=20))
-else:
-    # doesn't show animation in jupyter
-    plt.show()
-plt.close()
-
-hiring_data=challenger_data['hiring'][2022].sort_values(ascending=False).drop('TOTAL')[0:10]
-hiring_data=pd.merge(hiring_data,challenger_data['hiring'][2021],right_index=True,left_index=True)
-hiring_data=hiring_data.astype(int)
-industries=hiring_data.index.values
-h2021=hiring_data[2021].values
-h2022=hiring_data[2022].values
-
-# New job openings
-x_axis=np.arange(len(industries))
-fig, ax = plt.subplots(figsize=(7,5),constrained_layout=True)
-industries=[i.replace('_',' ') for i in industries]
-plt.bar(x_axis + 0.1,h2022,0.2,label='2022')
-plt.bar(x_axis - 0.1,h2021,0.2,label='2021')
-ax.yaxis.set_major_formatter(format_number)
-plt.xlabel('Industry')
-plt.ylabel('Number of New Job Openings')
-plt.title('Announced Job Openings in 2022 vs 2021')
-plt.xticks(x_axis, industries, rotation=45, ha="right", rotation_mode="anchor")
-plt.ylim([0, 500_000])
-plt.legend()
-plt.show()
-# Retail is 728k and 882k for 2022,2021
-
-# Total Compensation vs Layoffs Comparison
-total_comp_layoffs = data['salary_processed']['__company_comp_salaries']
-fig,ax = plt.subplots(figsize=(10, 5),constrained_layout=True)
-total_comp_layoffs.plot.bar(x='company', y='totalyearlycompensation',ax=ax)
-total_comp_layoffs.plot(x='company',y = 'percentage_laid_off',secondary_y =True,ax=ax,color='blue')
-for container in ax.containers:
-    ax.bar_label(container)
-ax.set_ylabel('Total Compensation')
-ax.yaxis.set_major_formatter(format_number)
-ax.right_ax.set_ylabel('Total Employees Laid Off')
-plt.ylabel('Percentage of Employees Laid Off')
-plt.xlabel('Company')
-plt.title('Comparison of Average Total Compensation and Layoffs for Top Tech Companies')
-plt.xticks(rotation=45, ha="right", rotation_mode="anchor")
-h1, l1 = ax.get_legend_handles_labels()
-h2, l2 = ax.right_ax.get_legend_handles_labels()
-ax.legend(h1+h2, l1+l2, loc='lower left')
-plt.show()
\ No newline at end of file
+
+# Funding Plots
+@figure('funds_raised_per_layoff_by_stage', ('layoff_processed', '__company_funding_stage'))
+def funds_per_layoff(funding_data: pd.DataFrame):
+    # Funds raised per Layoff by Stage
+    fig, ax = plt.subplots(figsize=(10, 5),constrained_layout=True)
+    ax.bar(funding_data.index, funding_data['Funds raised per Layoff'])
+    ax.get_yaxis().set_major_formatter(FuncFormatter(currency_mil))
+    ax.set_xlabel('Stage of Funding')
+    ax.set_ylabel('Funds raised per Layoff')
+    ax.set_title('Funds raised per Layoff by Stage of Funding')
+    plt.setp(ax.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor")
+    return fig
+
+
+@figure('average_layoffs_by_stage', ('layoff_processed', '__company_funding_stage'))
+def average_layoffs_by_stage(funding_data: pd.DataFrame):
+    # Stage of Funding versus average layoffs
+    fig, ax = plt.subplots(figsize=(10, 5),constrained_layout=True)
+    ax.bar(funding_data.index, funding_data['total_laid_off'])
+    ax.set_xlabel('Stage of Funding')
+    ax.set_ylabel('Average Layoffs')
+    ax.set_title('Average Layoffs by Stage of Funding')
+    plt.setp(ax.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor")
+    return fig
+
+
+@figure('layoffs_vs_funds_raised', ('layoff_processed', '__company_funding_raised'))
+def layoffs_vs_funds(funding_raised_layoffs: pd.DataFrame):
+    # Layoffs versus Funds Raised
+    funding_raised_layoffs = funding_raised_layoffs.dropna()
+    fig, ax = plt.subplots(figsize=(10, 6),constrained_layout=True)
+    ax.scatter(funding_raised_layoffs['funds_raised'], funding_raised_layoffs['total_laid_off'])
+    ax.set_xlabel('Funds Raised')
+    ax.set_ylabel('Layoffs')
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.get_xaxis().set_major_formatter(FuncFormatter(currency_mil))
+    ax.get_yaxis().set_major_formatter(ScalarFormatter())
+    plt.setp(ax.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor")
+    ax.set_title('Layoffs versus Funds Raised')
+    return fig
+
+
+@figure('sector_layoffs', ('layoff_processed', '__sector_layoffs'))
+def sector_layoffs(sector: pd.Series):
+    # Sector wise lay-offs in each industry
+    fig, ax = plt.subplots(figsize=(13, 5),constrained_layout=True)
+    sector.plot(kind='bar',width = 0.8, ax=ax)
+    ax.set_xlabel('Sector')
+    ax.set_ylabel('Number of layoffs')
+    ax.set_title('Sector-wise Layoffs (2020 - 2022 Feb)')
+    plt.setp(ax.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor")
+    return fig
+
+
+@figure('high_per_industry', ('layoff_processed', '__high_per_industry'))
+def high_per_industry(high_per_industry: pd.DataFrame):
+    # Number of companies having >20% layoff in each industry
+    fig, ax = plt.subplots(figsize=(13, 5),constrained_layout=True)
+    ax.bar(high_per_industry.index, high_per_industry['number of companies'], width=0.8)
+    ax.set_xlabel('Industry')
+    ax.set_ylabel('Number of Companies')
+    ax.set_title('Number of Companies Having 20% or Higher Layoffs by Industry')
+    plt.setp(ax.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor")
+    return fig
+
+
+@figure('high_per_country', ('layoff_processed', '__high_per_country'))
+def high_per_country(high_per_country: pd.DataFrame):
+    # Number of companies having >20% layoff in each country
+    fig, ax = plt.subplots(figsize=(13, 5),constrained_layout=True)
+    ax.bar(high_per_country.index, high_per_country['number of companies'], width=0.8)
+    ax.set_xlabel('Country')
+    ax.set_ylabel('Number of Companies')
+    ax.set_title('Number of Companies Having 20% or Higher Layoffs by Country')
+    plt.setp(ax.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor")
+    return fig
+
+
+@figure('high_per_country_pie', ('layoff_processed', '__high_per_country'))
+def high_per_country_pie(high_per_country: pd.DataFrame):
+    fig, ax = plt.subplots(figsize=(10, 5),constrained_layout=True)
+    ax.pie(high_per_country['number of companies'], labels=high_per_country.index, autopct='%1.1f%%', startangle=90)
+    return fig
+
+
+def reasons_curves(reason: pd.DataFrame) -> tuple:
+    """
+    Smoothed yearly curves of the top 5 reasons and their legend labels
+    """
+    to_plot_reason=(reason
+             .sort_values(by=[max(reason)],ascending=False)
+             .iloc[0:5].transpose()
+             .sort_index(ascending=False)
+             )
+    p_legend=[to_plot_reason.columns[i].replace('_',' ') + ': ' + str(to_plot_reason.iloc[0,i]) for i in range(len(to_plot_reason.columns))]
+    # Year converts to YYYY/Jan/1, however the data is for the end of year.
+    to_plot_reason.index=pd.to_datetime(to_plot_reason.index,format='%Y')
+    # interpolate for smooth curve in plot
+    to_plot_reason=to_plot_reason.reindex(pd.date_range(min(to_plot_reason.index),pd.to_datetime('jan 2, 2022'),freq="D"))
+    # so that endpoints of the plot are the values for 2022
+    to_plot_reason.iloc[-1]=to_plot_reason.iloc[-2]
+    # Spline method drastically overshoots the data points
+    to_plot_reason=to_plot_reason.interpolate(method='polynomial',order=2)
+    to_plot_reason=to_plot_reason.reindex(pd.date_range(min(to_plot_reason.index),max(to_plot_reason.index),freq="37D"))
+    return to_plot_reason, p_legend
+
+
+def reasons_axes():
+    # Plot parameters
+    fig, ax = plt.subplots(constrained_layout=True)
+    plt.setp(ax.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor") #rotate the x-axis values
+    ax.yaxis.set_major_formatter(format_number)
+    ax.xaxis.set_major_formatter(dates.DateFormatter('%Y'))
+    ax.set_ylabel('Number of cuts Per Year')
+    ax.set_xlabel('Year')
+    ax.set_title('Top 5 Reasons for Job Termination at the end of 2022')
+    ax.set_ylim([0, 200000])
+    return fig, ax
+
+
+def reasons_line_animation(reason: pd.DataFrame, fps: int = 20) -> LineAnimation:
+    """
+    Reasons curves precomputed once and drawn on the reasons axes
+    """
+    to_plot_reason, p_legend = reasons_curves(reason)
+    fig, ax = reasons_axes()
+    animation = LineAnimation(dates.date2num(to_plot_reason.index), to_plot_reason.to_numpy(), fps=fps)
+    animation.draw(ax, REASON_COLORS, p_legend)
+    return animation
+
+
+@figure('reasons', ('challenger', 'reason'))
+def reasons(reason: pd.DataFrame):
+    # Last frame of the reasons animation
+    animation = reasons_line_animation(reason)
+    animation.update(animation.frame_count - 1)
+    return animation.lines[0].figure
+
+
+def reasons_animation(reason: pd.DataFrame, save_file: str = None) -> None:
+    """
+    Shows the reasons animation, or writes it to save_file (.gif or .mp4)
+    """
+    animation = reasons_line_animation(reason)
+    if save_file:
+        # Saved gifs play once, looping makes this plot useless
+        animation.save(save_file, dpi=300)
+    else:
+        # doesn't show animation in jupyter
+        # The reference keeps the animation from being garbage collected before it draws
+        animator = animation.animation()
+        plt.show()
+    plt.close()
+
+
+@figure('job_openings', ('challenger', 'hiring'))
+def job_openings(hiring: pd.DataFrame):
+    hiring_data=hiring[2022].sort_values(ascending=False).drop('TOTAL')[0:10]
+    hiring_data=pd.merge(hiring_data,hiring[2021],right_index=True,left_index=True)
+    hiring_data=hiring_data.astype(int)
+    industries=hiring_data.index.values
+    h2021=hiring_data[2021].values
+    h2022=hiring_data[2022].values
+
+    # New job openings
+    x_axis=np.arange(len(industries))
+    fig, ax = plt.subplots(figsize=(7,5),constrained_layout=True)
+    industries=[i.replace('_',' ') for i in industries]
+    ax.bar(x_axis + 0.1,h2022,0.2,label='2022')
+    ax.bar(x_axis - 0.1,h2021,0.2,label='2021')
+    ax.yaxis.set_major_formatter(format_number)
+    ax.set_xlabel('Industry')
+    ax.set_ylabel('Number of New Job Openings')
+    ax.set_title('Announced Job Openings in 2022 vs 2021')
+    ax.set_xticks(x_axis, industries, rotation=45, ha="right", rotation_mode="anchor")
+    ax.set_ylim([0, 500_000])
+    ax.legend()
+    # Retail is 728k and 882k for 2022,2021
+    return fig
+
+
+@figure('compensation_layoffs', ('salary_processed', '__company_comp_salaries'))
+def compensation_layoffs(total_comp_layoffs: pd.DataFrame):
+    # Total Compensation vs Layoffs Comparison
+    fig,ax = plt.subplots(figsize=(10, 5),constrained_layout=True)
+    total_comp_layoffs.plot.bar(x='company', y='totalyearlycompensation',ax=ax)
+    total_comp_layoffs.plot(x='company',y = 'percentage_laid_off',secondary_y =True,ax=ax,color='blue')
+    for container in ax.containers:
+        ax.bar_label(container)
+    ax.set_ylabel('Total Compensation')
+    ax.yaxis.set_major_formatter(format_number)
+    ax.right_ax.set_ylabel('Percentage of Employees Laid Off')
+    ax.set_xlabel('Company')
+    ax.set_title('Comparison of Average Total Compensation and Layoffs for Top Tech Companies')
+    plt.setp(ax.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor")
+    h1, l1 = ax.get_legend_handles_labels()
+    h2, l2 = ax.right_ax.get_legend_handles_labels()
+    ax.legend(h1+h2, l1+l2, loc='lower left')
+    return fig
+
+
+def load_data(data_directory: str = 'data') -> dict:
+    """
+    Processed data of the whole data tree in one run, the Challenger
+    tables under 'challenger'
+    """
+    data = dict(ProcessData(data_directory).process())
+    data['challenger'] = {output_df: data.pop(output_df) for output_df in ('hiring', 'reason') if output_df in data}
+    return data
+
+
+def figure_inputs(data: dict, name: str):
+    """
+    Inputs of a registered figure, None if one of them is missing
+    """
+    _, inputs = FIGURES[name]
+    try:
+        return [data[group][key] for group, key in inputs]
+    except KeyError:
+        return None
+
+
+def input_hash(name: str, inputs: list, formats: tuple) -> str:
+    """
+    Content hash of a figure's inputs, its code and the output formats
+    """
+    digest = hashlib.sha1(f'{name}:{formats}'.encode())
+    digest.update(inspect.getsource(FIGURES[name][0]).encode())
+    for item in inputs:
+        digest.update(repr((list(item.columns) if isinstance(item, pd.DataFrame) else item.name, item.shape)).encode())
+        digest.update(pd.util.hash_pandas_object(item, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def _init_worker() -> None:
+    plt.switch_backend('Agg')
+    apply_style()
+
+
+def _render(name: str, inputs: list, output_dir: str, formats: tuple) -> list:
+    """
+    Draws one figure and saves it in every format, runs in a worker
+    """
+    fig = FIGURES[name][0](*inputs)
+    paths = []
+    for fmt in formats:
+        paths.append(os.path.join(output_dir, f'{name}.{fmt}'))
+        fig.savefig(paths[-1], format=fmt)
+    plt.close(fig)
+    return paths
+
+
+def render_all(data: dict, output_dir: str = 'plots', formats: tuple = ('png',), workers: int = None,
+               force: bool = False) -> dict:
+    """
+    Renders every registered figure concurrently on the Agg backend.
+    Figures whose input hash matches the manifest of the last render (and
+    whose files still exist) are skipped unless force is set. Returns a
+    dictionary, key is the figure name, value is the list of written
+    files (empty if it was skipped).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST)
+    try:
+        with open(manifest_path, 'r') as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        manifest = {}
+    pending, rendered = {}, {}
+    for name in FIGURES:
+        inputs = figure_inputs(data, name)
+        if inputs is None:
+            logger.warning(f'Skipping {name}, its inputs are missing')
+            continue
+        digest = input_hash(name, inputs, formats)
+        outputs = [os.path.join(output_dir, f'{name}.{fmt}') for fmt in formats]
+        if not force and manifest.get(name) == digest and all(os.path.isfile(path) for path in outputs):
+            logger.debug(f'{name} is up to date')
+            rendered[name] = []
+            continue
+        pending[name] = (inputs, digest)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {name: pool.submit(_render, name, inputs, output_dir, formats) for name, (inputs, _) in pending.items()}
+        for name, future in futures.items():
+            try:
+                rendered[name] = future.result()
+            except Exception as e:
+                logger.error(f'Error rendering {name}: {e}')
+                continue
+            manifest[name] = pending[name][1]
+    with open(manifest_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+    logger.debug(f'Rendered {len(pending)} of {len(FIGURES)} figures')
+    return rendered
+
+
+def show_all(data: dict, animation_file: str = None) -> None:
+    """
+    Shows every figure in turn and then the reasons animation
+    """
+    apply_style()
+    for name in FIGURES:
+        inputs = figure_inputs(data, name)
+        if inputs is not None and name != 'reasons':
+            FIGURES[name][0](*inputs)
+            plt.show()
+    reasons_animation(data['challenger']['reason'], save_file=animation_file)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Plot the processed layoff data')
+    parser.add_argument('--render', metavar='OUTPUT_DIR', help='render every figure headless to OUTPUT_DIR')
+    parser.add_argument('--format', nargs='+', default=['png'], choices=['png', 'svg', 'pdf'])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='render figures even if their inputs are unchanged')
+    parser.add_argument('--save-animation', metavar='FILE', nargs='?', const='plots/reasons.gif',
+                        help='write the reasons animation to FILE (.gif, or .mp4 with ffmpeg) instead of showing it')
+    args = parser.parse_args()
+    # shh...
+    logging.getLogger().setLevel('INFO')
+    data = load_data()
+    if args.render:
+        for name, paths in render_all(data, args.render, tuple(args.format), args.workers, args.force).items():
+            print(f'{name}: {", ".join(paths) or "up to date"}')
+    else:
+        show_all(data, animation_file=args.save_animation)
@@ -0,0 +1,68 @@
+import os
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class DataTree():
+    """
+    The data files of a directory and all of its subdirectories.
+
+    The tree is walked once with os.scandir, which returns the size and
+    modification time of each file with the directory listing, so every
+    file is fingerprinted without a separate stat call. Hidden files and
+    directories (.cache, .ingested.json...) are skipped.
+
+    Attributes
+    ----------
+    root: str
+        The top data directory
+    extensions: tuple
+        Extensions of the files kept, e.g. ('.csv', '.xlsx')
+
+    Public Methods
+    ----------
+    discover():
+        Returns a dictionary, key is the file path, value is its
+        (modification time, size) fingerprint
+    fingerprint():
+        Returns the sorted (path, modification time, size) of every file
+    relative_directory(filepath):
+        Returns the directory of a file relative to the root, '' at the root
+    """
+    def __init__(self, root: str, extensions: tuple) -> None:
+        self.root = root
+        self.extensions = tuple(extensions)
+        logger.debug(f'Initialized DataTree with root: {self.root}')
+
+    def __repr__(self) -> str:
+        return f'DataTree object\nRoot:\n\t{os.path.abspath(self.root)}\nExtensions: {", ".join(self.extensions)}'
+
+    def discover(self) -> dict:
+        files = {}
+        directories = [self.root]
+        while directories:
+            directory = directories.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError as e:
+                logger.error(f'Error listing {directory}: {e}')
+                continue
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir():
+                    directories.append(entry.path)
+                elif entry.is_file() and os.path.splitext(entry.name)[1] in self.extensions:
+                    stat = entry.stat()
+                    files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        logger.debug(f'Discovered {len(files)} files under {self.root}')
+        return dict(sorted(files.items()))
+
+    def fingerprint(self) -> tuple:
+        return tuple((filepath, *stamp) for filepath, stamp in self.discover().items())
+
+    def relative_directory(self, filepath: str) -> str:
+        directory = os.path.relpath(os.path.dirname(filepath), self.root)
+        return '' if directory == '.' else directory.replace(os.sep, '/')
@@ -0,0 +1,156 @@
+from __future__ import annotations
+import os
+import logging
+from collections import Counter
+from layoff_aggregates import LayoffAggregates
+from lazy_import import lazy_module
+
+
+logger = logging.getLogger(__name__)
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+
+class IncrementalLayoffs():
+    """
+    Persisted aggregates of the layoffs rows processed so far.
+
+    The layoffs tracker only appends new dated rows, so instead of
+    recomputing every aggregate each run, the LayoffAggregates of the
+    rows already seen are saved along with the last seen date. On the
+    next run only rows after that date are aggregated and merged in.
+    Rows on the last seen date (and rows without a date) are remembered
+    by their hash, so rows appended later on that same date are still
+    picked up exactly once.
+
+    Attributes
+    ----------
+    state_path: str
+        The file the state is saved to and loaded from
+    aggregates: LayoffAggregates
+        Aggregates of every row folded in so far
+    last_date: pd.Timestamp
+        Latest date folded in so far (None before the first update)
+
+    Public Methods
+    ----------
+    update(data):
+        Folds in the rows of data that have not been seen yet and returns
+        the aggregates of all rows
+    retract(rows):
+        Takes previously folded rows out again (deletions)
+    correct(old_rows, new_rows):
+        Replaces previously folded rows with their corrected values
+    save():
+        Writes the state to state_path
+    """
+    def __init__(self, state_path: str) -> None:
+        self.state_path = state_path
+        self.aggregates = None
+        self.last_date = None
+        self.boundary_rows = Counter()
+        if os.path.isfile(self.state_path):
+            state = pd.read_pickle(self.state_path)
+            self.aggregates = LayoffAggregates(state['groups'])
+            self.last_date = state['last_date']
+            self.boundary_rows = state['boundary_rows']
+            logger.debug(f'Loaded incremental state up to {self.last_date} from {self.state_path}')
+
+    def __repr__(self) -> str:
+        return f'IncrementalLayoffs object\nState file:\n\t{os.path.abspath(self.state_path)}\nLast date: {self.last_date}'
+
+    def update(self, data: pd.DataFrame) -> LayoffAggregates:
+        """
+        Aggregates the new rows of data and merges them into the state
+        """
+        dates = pd.to_datetime(data['date'], errors='coerce')
+        new_rows = self.__new_rows(data, dates)
+        logger.debug(f'Folding in {new_rows.sum()} of {len(data)} layoffs rows')
+        added = LayoffAggregates.from_frame(data.loc[new_rows])
+        self.aggregates = added if self.aggregates is None else self.aggregates.merge(added)
+        self.__track_boundary(data, dates)
+        return self.aggregates
+
+    def retract(self, rows: pd.DataFrame) -> LayoffAggregates:
+        """
+        Removes rows that were already folded in, e.g. deleted events
+        """
+        if self.aggregates is None:
+            raise ValueError('Nothing has been folded in yet')
+        self.aggregates = self.aggregates.subtract(LayoffAggregates.from_frame(rows))
+        self.boundary_rows.subtract(_hash_rows(rows))
+        self.boundary_rows = +self.boundary_rows
+        return self.aggregates
+
+    def correct(self, old_rows: pd.DataFrame, new_rows: pd.DataFrame) -> LayoffAggregates:
+        """
+        Replaces the folded in old_rows with new_rows. The corrected rows
+        count as seen, so they can't be dated after the last seen date
+        (fold those in with update instead).
+        """
+        if self.last_date is None:
+            raise ValueError('No events processed yet, fold rows in with update before correcting them')
+        dates = pd.to_datetime(new_rows['date'], errors='coerce')
+        if (dates > self.last_date).any():
+            raise ValueError(f'Corrected rows are dated after {self.last_date}')
+        self.retract(old_rows)
+        self.aggregates = self.aggregates.merge(LayoffAggregates.from_frame(new_rows))
+        self.boundary_rows.update(_hash_rows(new_rows.loc[self.__boundary(dates)]))
+        return self.aggregates
+
+    def save(self) -> None:
+        state = {'groups': self.aggregates.groups,
+                 'last_date': self.last_date,
+                 'boundary_rows': self.boundary_rows,
+                 }
+        pd.to_pickle(state, self.state_path + '.tmp')
+        os.replace(self.state_path + '.tmp', self.state_path)
+        logger.debug(f'Saved incremental state up to {self.last_date} to {self.state_path}')
+
+    def __new_rows(self, data: pd.DataFrame, dates: pd.Series) -> np.ndarray:
+        """
+        Rows after the last seen date, plus rows on that date (or without
+        a date) that are not among the remembered ones
+        """
+        if self.last_date is None:
+            return np.ones(len(data), dtype=bool)
+        new_rows = (dates > self.last_date).to_numpy()
+        boundary = self.__boundary(dates)
+        seen = self.boundary_rows.copy()
+        for position, row_hash in zip(np.flatnonzero(boundary), _hash_rows(data.loc[boundary])):
+            if seen[row_hash] > 0:
+                seen[row_hash] -= 1
+            else:
+                new_rows[position] = True
+        return new_rows
+
+    def __track_boundary(self, data: pd.DataFrame, dates: pd.Series) -> None:
+        """
+        Remembers the rows on the latest date and the rows without a date
+        """
+        latest = dates.max()
+        if pd.notna(latest) and (self.last_date is None or latest > self.last_date):
+            self.last_date = latest
+        self.boundary_rows = Counter(_hash_rows(data.loc[self.__boundary(dates)]))
+
+    def __boundary(self, dates: pd.Series) -> np.ndarray:
+        return ((dates == self.last_date) | dates.isna()).to_numpy()
+
+
+def _hash_rows(rows: pd.DataFrame) -> list:
+    """
+    Content hash of each row, independent of the index and of the column
+    dtypes: numbers are hashed as float64, dates as ISO strings (without
+    the time when it is midnight) and the rest as objects, missing values
+    as None
+    """
+    normalized = {}
+    for name, column in rows.items():
+        if pd.api.types.is_numeric_dtype(column):
+            normalized[name] = column.astype('float64')
+        elif pd.api.types.is_datetime64_any_dtype(column):
+            date_format = '%Y-%m-%d' if (column.dropna() == column.dropna().dt.normalize()).all() else '%Y-%m-%dT%H:%M:%S'
+            normalized[name] = column.dt.strftime(date_format).astype(object).where(column.notna(), None)
+        else:
+            normalized[name] = column.astype(object).where(column.notna(), None)
+    return pd.util.hash_pandas_object(pd.DataFrame(normalized, index=rows.index), index=False).tolist()
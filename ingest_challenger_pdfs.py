@@ -0,0 +1,220 @@
+# Headless batch extraction of the hiring and reason tables from the
+# Challenger Job Cuts reports in data/challenger_data/archive.
+# Only December reports are ingested, as their year-to-date columns are
+# the full-year figures the yearly tables in data/challenger_data hold.
+# Reading the PDFs needs the pypdf package.
+#
+# Usage:
+#   python ingest_challenger_pdfs.py [--archive DIR] [--output-dir DIR] [--workers N]
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+# Table title and label column header of each extracted table
+TABLES = {'reason': (re.compile('JOB CUTS BY REASON'), 'reason'),
+          'hiring': (re.compile('ANNOUNCED HIRING PLANS$'), 'INDUSTRY'),
+          }
+MONTH_PATTERN = re.compile(r'^(?:(\d{2})-([A-Za-z]{3})|([A-Za-z]{3})-(\d{2})|(January|February|March|April|May|June|'
+                           r'July|August|September|October|November|December))$', re.IGNORECASE)
+YTD_PATTERN = re.compile(r'YEAR[- ]TO[- ]DATE', re.IGNORECASE)
+NUMBER_PATTERN = re.compile(r'^[\d,]+$')
+MANIFEST = '.ingested.json'
+
+
+def pdf_hash(pdf_path: str) -> str:
+    '''sha1 of the pdf contents'''
+    digest = hashlib.sha1()
+    with open(pdf_path, 'rb') as pdf_file:
+        for block in iter(lambda: pdf_file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def report_year(pdf_path: str) -> int:
+    '''Year of the report from its file name, e.g. DEC14-..., December-2018-...'''
+    name = os.path.basename(pdf_path)
+    match = re.search(r'(20\d{2})', name) or re.search(r'(?:dec|december)[-_]?(\d{2})(?!\d)', name, re.IGNORECASE)
+    return int(match.group(1)) % 100 + 2000 if match else None
+
+
+def parse_header(line: str, year: int) -> tuple:
+    '''
+    Splits a table header into its columns. Returns the month of the
+    report and a list with the label of each value column: the monthly
+    column keeps its header, year-to-date columns become their year.
+    '''
+    tokens = YTD_PATTERN.sub('YTD', line).split()
+    month, columns = None, []
+    for idx, token in enumerate(tokens):
+        match = MONTH_PATTERN.match(token)
+        if match:
+            day_first, month_second, month_first, year_second, month_name = match.groups()
+            if month is None:
+                month = (month_second or month_first or month_name)[:3].title()
+                if day_first or year_second:
+                    year = 2000 + int(day_first or year_second)
+            columns.append(token)
+        elif token == 'YTD':
+            following = tokens[idx+1] if idx+1 < len(tokens) else ''
+            columns.append(int(following) if re.match(r'^\d{4}$', following) else year)
+    return month, columns
+
+
+def parse_rows(lines: list, columns: int) -> list:
+    '''
+    Parses table rows laid out as a label followed by numeric cells, up
+    to and including the TOTAL row. Blank cells (only ever the monthly
+    column) are filled with 0, labels wrapped over two lines are joined.
+    '''
+    rows, pending_label = [], ''
+    for line in lines:
+        cells = re.split(r'\s{2,}', line.strip())
+        if not line.strip() or cells[0].startswith('Copyright'):
+            continue
+        label = cells[0] if not NUMBER_PATTERN.match(cells[0]) else ''
+        numbers = [int(cell.replace(',', '')) for cell in cells[1 if label else 0:] if NUMBER_PATTERN.match(cell)]
+        label = ' '.join(filter(None, [pending_label, label]))
+        if not numbers:
+            pending_label = label
+            continue
+        pending_label = ''
+        numbers = [0]*(columns - len(numbers)) + numbers[-columns:]
+        rows.append([re.sub(r'\s+', '_', label.replace(',', '').strip())] + numbers)
+        if label.upper() == 'TOTAL':
+            break
+    return rows
+
+
+def find_table(page_lines: list, table: str, year: int):
+    '''Header and rows of a table in the lines of a page, None if it isn't there'''
+    title, label_header = TABLES[table]
+    for idx, line in enumerate(page_lines):
+        if not title.search(line.strip()):
+            continue
+        for header_idx in range(idx+1, min(idx+6, len(page_lines))):
+            month, columns = parse_header(page_lines[header_idx], year)
+            if columns and (table != 'hiring' or 'INDUSTRY' in page_lines[header_idx]):
+                rows = parse_rows(page_lines[header_idx+1:], len(columns))
+                return month, [label_header] + columns, rows
+    return None
+
+
+def extract_report(pdf_path: str) -> dict:
+    '''
+    Extracts the tables of one report. Returns a dictionary with the
+    csv text of each output file, the number of pages and why the
+    report was skipped (None if it wasn't).
+    '''
+    from pypdf import PdfReader
+    reader = PdfReader(pdf_path)
+    year = report_year(pdf_path)
+    result = {'tables': {}, 'pages': len(reader.pages), 'skipped': None}
+    for page in reader.pages:
+        page_lines = page.extract_text(extraction_mode='layout').splitlines()
+        for table in TABLES:
+            found = find_table(page_lines, table, year)
+            if not found or any(name.endswith(f'_{table}.csv') for name in result['tables']):
+                continue
+            month, header, rows = found
+            if month != 'Dec':
+                result['skipped'] = f'{month} report, year-to-date columns are not full years'
+                return result
+            years = sorted(column for column in header[1:] if isinstance(column, int))
+            name = '-'.join(str(y) for y in dict.fromkeys([years[0], years[-1]]))
+            lines = [', '.join(str(cell) for cell in row) for row in [header] + rows]
+            result['tables'][f'{name}_{table}.csv'] = '\n'.join(lines) + '\n'
+    if not result['tables']:
+        result['skipped'] = 'no hiring or reason table found'
+    return result
+
+
+class PdfIngestor():
+    """
+    Extracts the hiring and reason tables of every report in the archive
+    concurrently on a process pool and writes them as <year>_hiring.csv
+    and <year>_reason.csv. Reports are remembered by the hash of their
+    contents, so a rerun only extracts new (or changed) reports.
+
+    Attributes
+    ----------
+    archive_dir: str
+        Directory of the report PDFs
+    output_dir: str
+        Directory the csv files (and the manifest of ingested reports)
+        are written to
+    workers: int
+        Number of reports extracted concurrently
+
+    Public Methods
+    ----------
+    process():
+        Ingests the new reports and returns a dictionary, key is the
+        report file name, value is its manifest entry
+    """
+    def __init__(self, archive_dir: str, output_dir: str, workers: int = None) -> None:
+        self.archive_dir = archive_dir
+        self.output_dir = output_dir
+        self.workers = workers
+        self.pages = 0
+        logger.debug(f'Initialized PdfIngestor with archive directory: {self.archive_dir}')
+
+    def process(self) -> dict:
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest = self.__load_manifest()
+        pending = {}
+        for pdf_path in sorted(glob.glob(os.path.join(self.archive_dir, '*.pdf'))):
+            digest = pdf_hash(pdf_path)
+            entry = manifest.get(digest)
+            if entry and all(os.path.isfile(os.path.join(self.output_dir, name)) for name in entry['outputs']):
+                logger.debug(f'{pdf_path} already ingested')
+                continue
+            pending[digest] = pdf_path
+        ingested = {}
+        self.pages = 0
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for digest, result in zip(pending, pool.map(extract_report, pending.values())):
+                pdf_path = pending[digest]
+                self.pages += result['pages']
+                for name, csv_text in result['tables'].items():
+                    with open(os.path.join(self.output_dir, name), 'w') as csv_file:
+                        csv_file.write(csv_text)
+                if result['skipped']:
+                    logger.debug(f'Skipped {pdf_path}: {result["skipped"]}')
+                manifest[digest] = ingested[os.path.basename(pdf_path)] = {'pdf': os.path.basename(pdf_path),
+                                                                          'outputs': sorted(result['tables']),
+                                                                          'skipped': result['skipped'],
+                                                                          }
+        self.__save_manifest(manifest)
+        logger.debug(f'Ingested {len(ingested)} reports')
+        return ingested
+
+    def __load_manifest(self) -> dict:
+        try:
+            with open(os.path.join(self.output_dir, MANIFEST), 'r') as manifest_file:
+                return json.load(manifest_file)
+        except (OSError, ValueError):
+            return {}
+
+    def __save_manifest(self, manifest: dict) -> None:
+        with open(os.path.join(self.output_dir, MANIFEST), 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Extract hiring and reason tables from the Challenger report archive')
+    parser.add_argument('--archive', default='data/challenger_data/archive')
+    parser.add_argument('--output-dir', default='data/challenger_data/extracted')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    ingestor = PdfIngestor(args.archive, args.output_dir, args.workers)
+    for report, entry in ingestor.process().items():
+        print(f'{report}: {", ".join(entry["outputs"]) or entry["skipped"]}')
@@ -0,0 +1,111 @@
+import json
+import time
+import logging
+import threading
+import tracemalloc
+
+
+logger = logging.getLogger(__name__)
+
+# Stages whose calls take a file path rather than data, they have no rows_in
+FILE_STAGES = ('read',)
+
+
+class Profiler():
+    """
+    Records the wall time, rows in/out and peak memory of each CSV read
+    and processing function call.
+
+    Pass a Profiler to ReadData/ProcessData to enable it, without one the
+    instrumented calls go straight through (see profiled). Peak memory is
+    measured with tracemalloc, which slows the calls down, so it can be
+    turned off. With several workers the calls overlap and the peak of
+    one call includes allocations of the others running at the same time.
+
+    Attributes
+    ----------
+    track_memory: bool
+        Measure the peak memory of each call
+    callbacks: list
+        Functions called with each record as soon as it is made
+    records: list
+        One dictionary per call with its stage, name, wall_time (s),
+        rows_in, rows_out and peak_memory (bytes). For reads ('read')
+        rows_in is None and rows_out is the rows read (None for a CSV
+        streamed in chunks). For processing ('process', 'yearly') rows_in
+        is the rows of the input data and rows_out those of the result
+        (None when it isn't a table)
+
+    Public Methods
+    ----------
+    call(stage, name, func, *args):
+        Calls func(*args) and records it
+    report():
+        Returns the records and the total wall time of each stage
+    to_json(filepath):
+        Returns the report as JSON, and writes it to filepath if given
+    """
+    def __init__(self, track_memory: bool = True, callbacks: list = None) -> None:
+        self.track_memory = track_memory
+        self.callbacks = callbacks or []
+        self.records = []
+        self.__lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f'Profiler object\nRecords: {len(self.records)}'
+
+    def call(self, stage: str, name: str, func, *args):
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            memory_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = func(*args)
+        wall_time = time.perf_counter() - start
+        record = {'stage': stage,
+                  'name': name,
+                  'wall_time': wall_time,
+                  'rows_in': _rows(args[0]) if args and stage not in FILE_STAGES else None,
+                  'rows_out': _rows(result),
+                  'peak_memory': max(0, tracemalloc.get_traced_memory()[1] - memory_start) if self.track_memory else None,
+                  }
+        with self.__lock:
+            self.records.append(record)
+        for callback in self.callbacks:
+            callback(record)
+        return result
+
+    def report(self) -> dict:
+        totals = {}
+        for record in self.records:
+            totals[record['stage']] = totals.get(record['stage'], 0) + record['wall_time']
+        return {'records': self.records, 'totals': totals}
+
+    def to_json(self, filepath: str = None) -> str:
+        report = json.dumps(self.report(), indent=1)
+        if filepath:
+            with open(filepath, 'w') as report_file:
+                report_file.write(report)
+        return report
+
+
+def profiled(profiler, stage: str, name: str, func, *args):
+    """
+    Calls func(*args), through the profiler if there is one
+    """
+    if profiler is None:
+        return func(*args)
+    return profiler.call(stage, name, func, *args)
+
+
+def _rows(data):
+    """
+    Number of rows of a DataFrame/Series (or of a list or dict of them)
+    """
+    if isinstance(data, dict):
+        data = list(data.values())
+    if isinstance(data, (list, tuple)):
+        rows = [_rows(item) for item in data]
+        return None if None in rows else sum(rows)
+    return len(data) if hasattr(data, 'shape') else None
@@ -0,0 +1,193 @@
+from __future__ import annotations
+import logging
+from lazy_import import lazy_module
+
+
+logger = logging.getLogger(__name__)
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+# Stages left out of the funding summaries
+EXCLUDED_STAGES = ['Post-IPO', 'Acquired', 'Unknown', 'Private Equity', 'Subsidiary']
+# percentage_laid_off above which a layoff counts as "high"
+HIGH_PERCENTAGE = 0.2
+
+# Partial aggregates kept for each grouping key
+KEY_COLUMNS = {'industry': ('rows', 'total', 'total_count', 'high_rows', 'high_companies'),
+               'country':  ('rows', 'total', 'high_rows', 'high_companies'),
+               'company':  ('rows', 'total'),
+               'stage':    ('rows', 'total', 'total_count', 'funds', 'funds_count'),
+               }
+COUNT_COLUMNS = ('rows', 'total_count', 'funds_count', 'high_rows', 'high_companies')
+# ProcessData layoff functions that LayoffAggregates.results() computes
+FUSED_FUNCTIONS = ('__industry_layoffs',
+                   '__sector_layoffs',
+                   '__country_layoffs',
+                   '__company_layoffs',
+                   '__company_funding_stage',
+                   '__high_per_industry',
+                   '__high_per_country',
+                   )
+
+
+class LayoffAggregates():
+    """
+    Fused, mergeable aggregates of the layoffs dataset.
+
+    Each grouping key (industry, country, company, stage) is factorized
+    once and every sum/count used by the ProcessData layoff functions is
+    computed for it with np.bincount. Because the aggregates are plain
+    sums and counts, two LayoffAggregates can be merged to get the
+    aggregates of the combined rows.
+
+    Attributes
+    ----------
+    groups: dict
+        key is the grouping column, value is a DataFrame indexed by the
+        sorted key values with one column per partial aggregate
+
+    Public Methods
+    ----------
+    from_frame(data):
+        Builds the aggregates of a layoffs DataFrame in one pass
+    merge(other):
+        Returns the aggregates of both objects combined
+    subtract(other):
+        Returns these aggregates with the rows of other taken out
+    results():
+        Returns a dictionary, key is the name of the ProcessData function
+        value is the same output that function gives on the full data
+    """
+    def __init__(self, groups: dict) -> None:
+        self.groups = groups
+
+    def __repr__(self) -> str:
+        sizes = ', '.join(f'{key}: {len(group)}' for key, group in self.groups.items())
+        return f'LayoffAggregates object\nGroups:\n\t{sizes}'
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame) -> 'LayoffAggregates':
+        """
+        Factorizes each grouping key once and computes every partial
+        aggregate for it with a vectorized bincount.
+        """
+        total = _as_float(data['total_laid_off'])
+        funds = _as_float(data['funds_raised'])
+        high = _as_float(data['percentage_laid_off']) > HIGH_PERCENTAGE
+        total_valid = ~np.isnan(total)
+        funds_valid = ~np.isnan(funds)
+        weights = {'rows':           None,
+                   'total':          np.where(total_valid, total, 0.0),
+                   'total_count':    total_valid,
+                   'funds':          np.where(funds_valid, funds, 0.0),
+                   'funds_count':    funds_valid,
+                   'high_rows':      high,
+                   'high_companies': high & data['company'].notna().to_numpy(),
+                   }
+        groups = {}
+        for key, columns in KEY_COLUMNS.items():
+            codes, uniques = pd.factorize(data[key], sort=True)
+            valid = codes >= 0
+            if valid.all():
+                valid = slice(None)
+            codes = codes[valid]
+            size = len(uniques)
+            groups[key] = pd.DataFrame({column: _bincount(codes, weights[column], valid, size)
+                                        for column in columns},
+                                       index=pd.Index(np.asarray(uniques), name=key))
+        logger.debug(f'Fused aggregation over {len(data)} rows')
+        return cls(groups)
+
+    def merge(self, other: 'LayoffAggregates') -> 'LayoffAggregates':
+        """
+        Adds the aggregates of another LayoffAggregates to these ones
+        """
+        return self.__combine(other, sign=1)
+
+    def subtract(self, other: 'LayoffAggregates') -> 'LayoffAggregates':
+        """
+        Removes the aggregates of rows that were already added, used to
+        replay deletions and corrections
+        """
+        return self.__combine(other, sign=-1)
+
+    def __combine(self, other: 'LayoffAggregates', sign: int) -> 'LayoffAggregates':
+        groups = {}
+        for key in KEY_COLUMNS:
+            combined = self.groups[key].add(sign*other.groups[key], fill_value=0)
+            combined = combined.loc[combined['rows'] != 0]
+            groups[key] = combined.sort_index().rename_axis(key)
+        return LayoffAggregates(groups)
+
+    def results(self) -> dict:
+        """
+        Builds the output of each fused ProcessData function
+        """
+        return {'__industry_layoffs':       self.__key_layoffs('industry'),
+                '__sector_layoffs':         self.__sector_layoffs(),
+                '__country_layoffs':        self.__key_layoffs('country'),
+                '__company_layoffs':        self.__key_layoffs('company'),
+                '__company_funding_stage':  self.__company_funding_stage(),
+                '__high_per_industry':      self.__high_per_industry(),
+                '__high_per_country':       self.__high_per_country(),
+                }
+
+    def __group(self, key: str) -> pd.DataFrame:
+        # Keys only exist in groupby output if they have at least one row
+        group = self.groups[key]
+        group = group.loc[group['rows'] > 0]
+        counts = [column for column in group.columns if column in COUNT_COLUMNS]
+        return group.astype({column: 'int64' for column in counts})
+
+    def __key_layoffs(self, key: str) -> pd.DataFrame:
+        group = self.__group(key)
+        layoffs = pd.DataFrame({'total_laid_off': group['total']})
+        return layoffs.sort_values(by='total_laid_off', ascending=False)
+
+    def __sector_layoffs(self) -> pd.Series:
+        group = self.__group('industry')
+        sector = group['total'].div(group['total_count'].where(group['total_count'] > 0))
+        return sector.rename('total_laid_off')
+
+    def __company_funding_stage(self) -> pd.DataFrame:
+        group = self.__group('stage')
+        group = group.loc[~group.index.isin(EXCLUDED_STAGES)]
+        stage_data = pd.DataFrame({'funds_raised': group['funds'].div(group['funds_count'].where(group['funds_count'] > 0)),
+                                   'total_laid_off': group['total'].div(group['total_count'].where(group['total_count'] > 0)),
+                                   })
+        stage_data = stage_data.sort_values(by='total_laid_off', ascending=False)
+        stage_data['Funds raised per Layoff'] = stage_data['funds_raised'].div(stage_data['total_laid_off'])
+        return stage_data
+
+    def __high_counts(self, key: str) -> pd.Series:
+        group = self.__group(key)
+        group = group.loc[group['high_rows'] > 0]
+        return group['high_companies'].rename('company')
+
+    def __high_per_industry(self) -> pd.DataFrame:
+        per_industry = self.__high_counts('industry')
+        per_industry = per_industry.loc[per_industry.index != 'Other'].sort_values(ascending=False)[:10]
+        per_industry = pd.DataFrame(per_industry).rename(columns={'company':'number of companies'})
+        return per_industry
+
+    def __high_per_country(self) -> pd.DataFrame:
+        per_country = self.__high_counts('country').sort_values(ascending=False)
+        per_country = pd.concat([per_country[:5], pd.Series({'Other Countries' : per_country[5:].sum()})])
+        per_country = pd.DataFrame(per_country).rename(columns={0:'number of companies'})
+        return per_country
+
+
+def _as_float(column: pd.Series) -> np.ndarray:
+    """
+    Numeric column as a float64 array with NaN for missing values
+    """
+    return pd.to_numeric(column, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _bincount(codes: np.ndarray, weights, valid, size: int) -> np.ndarray:
+    """
+    Per-code sum of weights (or number of rows if weights is None)
+    """
+    if weights is not None:
+        weights = np.asarray(weights, dtype='float64')[valid]
+    return np.bincount(codes, weights=weights, minlength=size).astype('float64')
@@ -0,0 +1,37 @@
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is only imported when one of its
+    attributes is first used.
+
+    pandas and numpy take most of the startup time of the processing
+    modules, so they bind them with pd = lazy_module('pandas') and
+    importing ReadData or ProcessData stays cheap. Once imported, the
+    module's attributes are copied onto the stand-in, so later lookups
+    are plain attribute lookups. Type annotations must not be evaluated
+    at import (from __future__ import annotations).
+
+    Attributes
+    ----------
+    __name__: str
+        Name of the wrapped module
+    """
+    def __getattr__(self, attribute: str):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attribute)
+
+    def __repr__(self) -> str:
+        return f'LazyModule object\nModule: {self.__name__}'
+
+
+def lazy_module(name: str) -> types.ModuleType:
+    """
+    The module if it is already imported, a LazyModule otherwise
+    """
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
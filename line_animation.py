@@ -0,0 +1,152 @@
+import os
+import logging
+import subprocess
+import numpy as np
+import matplotlib as mpl
+import matplotlib.animation as ani
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+logger = logging.getLogger(__name__)
+
+
+class LineAnimation():
+    """
+    Animation of curves drawn from left to right, one point per frame.
+
+    The curves are precomputed arrays. One Line2D is created per curve
+    and every frame only changes the data of those lines, so a frame
+    costs the same however far the animation is, and when shown with
+    blitting only the lines are redrawn over the cached axes. Saving
+    blits too: the figure is drawn (and laid out) once without the lines
+    at the saving dpi, then every frame restores that background, draws
+    the lines over it and pipes the raw pixels to ffmpeg, which encodes
+    them as they come. Without ffmpeg only .gif files can be saved, with
+    Pillow, which keeps every frame in memory until the file is written.
+
+    Attributes
+    ----------
+    x: np.ndarray
+        x values of the points, shape (points,)
+    curves: np.ndarray
+        y values of each curve, shape (points, curves)
+    fps: int
+        Frames per second of the shown and saved animation
+    frame_count: int
+        Number of frames, the first one is empty and the last one has
+        every point
+
+    Public Methods
+    ----------
+    draw(ax, colors, labels):
+        Creates the lines and the legend on ax and fixes the axis limits
+    animation():
+        Returns a blitted FuncAnimation of the frames, for plt.show()
+    save(filepath, dpi):
+        Writes every frame to a .gif or .mp4 file
+    """
+    def __init__(self, x, curves, fps: int = 20) -> None:
+        self.x = np.asarray(x, dtype='float64')
+        self.curves = np.asarray(curves, dtype='float64').reshape(len(self.x), -1)
+        self.fps = fps
+        self.frame_count = len(self.x) + 1
+        self.lines = []
+
+    def __repr__(self) -> str:
+        return f'LineAnimation object\nCurves: {self.curves.shape[1]}\nFrames: {self.frame_count} at {self.fps} fps'
+
+    def draw(self, ax, colors: list = None, labels: list = None) -> list:
+        """
+        Lines start empty, the x limits are those of the whole curves (the
+        y limits are left to the caller if already set)
+        """
+        self.lines = ax.plot(np.empty((0, self.curves.shape[1])), np.empty((0, self.curves.shape[1])))
+        for i, line in enumerate(self.lines):
+            if colors:
+                line.set_color(colors[i % len(colors)])
+        if labels:
+            ax.legend(self.lines, labels, loc='upper left')
+        if len(self.x):
+            ax.set_xlim(self.x.min(), self.x.max())
+        if ax.get_autoscaley_on() and self.curves.size:
+            ax.set_ylim(np.nanmin(self.curves), np.nanmax(self.curves))
+        return self.lines
+
+    def update(self, frame: int) -> list:
+        """
+        Shows the first frame points of every curve
+        """
+        for i, line in enumerate(self.lines):
+            line.set_data(self.x[:frame], self.curves[:frame, i])
+        return self.lines
+
+    def animation(self) -> ani.FuncAnimation:
+        fig = self.lines[0].figure
+        return ani.FuncAnimation(fig, self.update, frames=self.frame_count, init_func=lambda: self.update(0),
+                                 interval=1000/self.fps, blit=True, repeat=False)
+
+    def save(self, filepath: str, dpi: int = 100) -> None:
+        """
+        The figure keeps its lines, dpi, canvas and layout engine
+        """
+        fig = self.lines[0].figure
+        extension = os.path.splitext(filepath)[1].lower()
+        streaming = ani.writers.is_available('ffmpeg')
+        if not streaming and extension != '.gif':
+            raise ValueError(f'No writer for {filepath}, .mp4 and other video files need ffmpeg')
+        canvas, engine, figure_dpi = fig.canvas, fig.get_layout_engine(), fig.dpi
+        try:
+            fig.set_dpi(dpi)
+            agg = FigureCanvasAgg(fig)
+            for line in self.lines:
+                line.set_animated(True)
+            agg.draw()
+            # The layout is computed by the first draw only
+            fig.set_layout_engine('none')
+            background = agg.copy_from_bbox(fig.bbox)
+            frames = (self.__render(agg, background, frame) for frame in range(self.frame_count))
+            if streaming:
+                self.__save_ffmpeg(filepath, frames, agg.get_width_height())
+            else:
+                self.__save_pillow(filepath, frames)
+        finally:
+            for line in self.lines:
+                line.set_animated(False)
+            fig.set_layout_engine(engine)
+            fig.set_dpi(figure_dpi)
+            fig.set_canvas(canvas)
+        logger.debug(f'Saved {self.frame_count} frames to {filepath}')
+
+    def __render(self, agg: FigureCanvasAgg, background, frame: int) -> memoryview:
+        """
+        RGBA pixels of one frame, the lines drawn over the background
+        """
+        agg.restore_region(background)
+        for line in self.update(frame):
+            agg.figure.draw_artist(line)
+        return agg.buffer_rgba()
+
+    def __save_ffmpeg(self, filepath: str, frames, size: tuple) -> None:
+        width, height = size
+        command = [mpl.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+                   '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}', '-r', str(self.fps), '-i', '-']
+        if filepath.lower().endswith('.gif'):
+            # Plays once, looping makes the chart useless
+            command += ['-loop', '-1']
+        else:
+            command += ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p']
+        with subprocess.Popen(command + [filepath], stdin=subprocess.PIPE, stderr=subprocess.PIPE) as ffmpeg:
+            try:
+                for pixels in frames:
+                    ffmpeg.stdin.write(pixels)
+            except BrokenPipeError:
+                pass
+            _, errors = ffmpeg.communicate()
+        if ffmpeg.returncode != 0:
+            raise RuntimeError(f'ffmpeg failed writing {filepath}:\n{errors.decode(errors="replace")}')
+
+    def __save_pillow(self, filepath: str, frames) -> None:
+        from PIL import Image
+        images = [Image.frombuffer('RGBA', (pixels.shape[1], pixels.shape[0]), bytes(pixels), 'raw', 'RGBA', 0, 1)
+                  .convert('RGB') for pixels in map(np.asarray, frames)]
+        images[0].save(filepath, save_all=True, append_images=images[1:], duration=1000/self.fps)
@@ -5,12 +5,33 @@
 # Limitations: Since the only consistent field delimiter is white space,
 # fields filled with empty space in the PDF need to be manually
 # filled in the text file.
+#
+# Usage:
+#   python process_challenger_tables.py
+#       converts challenger.txt, asking for the output name and columns
+#   python process_challenger_tables.py --batch <directory> [--columns N]
+#       converts every .txt table in a directory without any prompts
 
+import argparse
 import fileinput
+import glob
+import re
 import sys
 import string
 import os
-from tkinter import simpledialog
+
+# Purpose of replacements: we have space separated fields
+# with field entries that contain spaces...
+# Need to ensure the only spaces in the text
+# are between fields.
+REPLACEMENTS = {'9 R':'9_R',    # ex: ..vid-19 Recov...
+                ',':'',
+                }
+
+# A space between two text (letter or punctuation) characters is part of
+# a text entry, a space next to a number separates fields
+_TEXT_CHAR = '[^\\W\\d_]|[' + re.escape(string.punctuation) + ']'
+UNDERSCORE_PATTERN = re.compile(f'(?<={_TEXT_CHAR})\\s(?={_TEXT_CHAR})')
 
 
 def feed_words(ip_file:str) -> str:
@@ -20,78 +41,122 @@ def feed_words(ip_file:str) -> str:
             for word in line.split():
                 yield word
 
+def read_lines(ip_file:str):
+    '''feed lines one at a time from txt file'''
+    with open(ip_file,'r') as ip_data:
+        yield from ip_data
+
+def substitute_lines(lines, replacements: dict):
+    '''Does specific string replacements on each line, in order.'''
+    rules = [(re.compile(re.escape(search_exp)), subst_exp)
+             for search_exp,subst_exp in replacements.items()]
+    for line in lines:
+        for rule,subst_exp in rules:
+            line = rule.sub(subst_exp, line)
+        yield line
+
+def collapse_spaces(lines):
+    '''Single space between fields and a trailing space before the newline'''
+    for line in lines:
+        yield ' '.join(line.split()) + ' \n'
+
+def underscore_lines(lines):
+    '''
+    Specific for these tables where any text field is next
+    to a numeric field. Underscores are not placed between
+    (text or punctuation) and numbers.
+    '''
+    for line in lines:
+        yield UNDERSCORE_PATTERN.sub('_', line)
+
+def csv_rows(lines, columns=None):
+    '''
+    Groups the words of the lines into csv rows of columns fields.
+    If columns is None it is the number of fields of the first line
+    (the table header). An incomplete last row is dropped.
+    '''
+    new_line=[]
+    for line in lines:
+        words=line.split()
+        if columns is None and words:
+            columns=len(words)
+        for word in words:
+            new_line.append(word.replace(',',''))
+            if len(new_line)==columns:
+                yield ', '.join(new_line) + '\n'
+                new_line=[]
+
+def table_pipeline(input_file:str, columns=None, replacements: dict = REPLACEMENTS):
+    '''All the cleanup stages chained as generators over the text table'''
+    lines=read_lines(input_file)
+    lines=substitute_lines(lines, replacements)
+    lines=collapse_spaces(lines)
+    lines=underscore_lines(lines)
+    return csv_rows(lines, columns)
+
+def convert_table(input_file:str, output_file:str, columns=None, replacements: dict = REPLACEMENTS) -> None:
+    '''Converts a text table extracted from a Challenger pdf to csv in one pass'''
+    assert columns is None or (isinstance(columns,int) and columns>0), 'Should have at least 1 column...'
+    with open(output_file,'w') as op_file:
+        op_file.writelines(table_pipeline(input_file, columns, replacements))
+
+def convert_directory(input_dir:str, output_dir:str, columns=None) -> list:
+    '''Converts every .txt table in input_dir to a csv of the same name in output_dir'''
+    os.makedirs(output_dir, exist_ok=True)
+    output_files=[]
+    for input_file in sorted(glob.glob(os.path.join(input_dir,'*.txt'))):
+        name=os.path.splitext(os.path.basename(input_file))[0]
+        output_file=os.path.join(output_dir,name+'.csv')
+        convert_table(input_file,output_file,columns)
+        output_files.append(output_file)
+    return output_files
+
 def csv_from_txt(input_file:str,output_file,columns=4) -> None:
     '''Converts text tables extracted from Challenger pdf's to csv'''
     assert isinstance(columns,int) and columns>0, 'Should have at least 1 column...'
     with open(output_file,'w') as op_file:
-        count=0
-        new_line=[]
-        for word in feed_words(input_file):
-            new_line.append(word.replace(',','') +', ')
-            count+=1
-            if not count%columns:
-                last_word=new_line.pop()
-                new_line.append(last_word[:-2])
-                new_line.append('\n')
-                op_file.write(''.join(new_line))
-                new_line=[]
+        op_file.writelines(csv_rows(read_lines(input_file),columns))
 
 def substitute_str(the_file: str, replacements: dict) -> None:
     '''Does specific string replacements in a text file.'''
-    for line in fileinput.input(the_file, inplace=1):
-        for search_exp,subst_exp in replacements.items():
-            if search_exp in line:
-                line=line.replace(search_exp,subst_exp)
+    for line in substitute_lines(fileinput.input(the_file, inplace=1), replacements):
         sys.stdout.write(line)
 
 def underscore_text_entries(the_file: str) -> None:
-    '''
-    Specific for these tables where any text field is next
-    to a numeric field. Underscores are not placed between
-    (text or punctuation) and numbers.
-    '''
-    punct = string.punctuation
-    for line in fileinput.input(the_file, inplace=1):
-        for idx,ch in enumerate(line):
-            if (ch.isspace() 
-                and idx>0 
-                and idx<len(line)-2
-                and (line[idx-1].isalpha() 
-                     or line[idx-1] in punct)
-                and (line[idx+1].isalpha() 
-                     or line[idx+1] in punct)
-                ):
-                search_exp=line[idx-1:idx+2]
-                subst_exp=line[idx-1]+'_'+line[idx+1]
-                line=line.replace(search_exp,subst_exp)
+    '''Underscores the spaces inside text entries of a text file.'''
+    for line in underscore_lines(fileinput.input(the_file, inplace=1)):
         sys.stdout.write(line)
 
 def remove_multiple_space(the_file: str) -> None:
     '''Changes done inline on text files'''
-    for line in fileinput.input(the_file, inplace=1):
-        line=(' '.join(line.split()))
-        line=(' '.join([line,'\n']))
+    for line in collapse_spaces(fileinput.input(the_file, inplace=1)):
         sys.stdout.write(line)
 
-        
-if __name__=="__main__":
-    temp_file='challenger.txt'
+def interactive(temp_file:str) -> None:
+    '''Asks for the output name and number of columns of one table'''
+    from tkinter import simpledialog
     assert os.path.isfile(temp_file),"check the input file"
-    # Purpose of replacements: we have space separated fields
-    # with field entries that contain spaces...
-    # Need to ensure the only spaces in the text
-    # are between fields.
-    replacements = {'9 R':'9_R',    # ex: ..vid-19 Recov...
-                    ',':'',
-                    }
     output_file=simpledialog.askstring('Process Challenger Tables', 'Enter file name:\t\t\t')
     if not output_file:
         raise ValueError
     output_file=os.path.join('data/challenger_data',output_file+'.csv')
-    substitute_str(temp_file,replacements)
-    remove_multiple_space(temp_file)
-    underscore_text_entries(temp_file)
     columns=simpledialog.askinteger('Process Challenger Tables', 'Enter number of columns:\t\t\t')
     if not columns:
         raise ValueError
-    csv_from_txt(temp_file,output_file,columns)
+    convert_table(temp_file,output_file,columns)
+
+
+if __name__=="__main__":
+    parser=argparse.ArgumentParser(description='Convert text tables copied from Challenger reports to csv')
+    parser.add_argument('--batch', metavar='DIRECTORY',
+                        help='convert every .txt table in DIRECTORY without prompting')
+    parser.add_argument('--output-dir', default='data/challenger_data',
+                        help='where batch mode writes the csv files')
+    parser.add_argument('--columns', type=int, default=None,
+                        help='fields per row, by default the number of header fields')
+    args=parser.parse_args()
+    if args.batch:
+        for output_file in convert_directory(args.batch,args.output_dir,args.columns):
+            print(output_file)
+    else:
+        interactive('challenger.txt')
@@ -0,0 +1,227 @@
+from __future__ import annotations
+import os
+import logging
+import threading
+from collections import OrderedDict
+from data_processing import ProcessData
+from read_data import READERS
+from discovery import DataTree
+from layoff_aggregates import EXCLUDED_STAGES, HIGH_PERCENTAGE
+from rollup import RollupCube
+from lazy_import import lazy_module
+
+
+logger = logging.getLogger(__name__)
+pd = lazy_module('pandas')
+
+GROUP_KEYS = ('industry', 'country', 'company', 'stage')
+
+
+class QueryService():
+    """
+    Long-lived query API over the datasets of a data directory.
+
+    The data is loaded once with ProcessData and kept in memory. The
+    queries generalize the ProcessData functions (thresholds, top-N and
+    date windows are parameters, the defaults give the same output as
+    the functions) and their results are memoized in a bounded LRU
+    cache. Before each query the files of the data directory are checked
+    (path, modification time and size), and if any changed the data is
+    reloaded and the cache cleared.
+
+    Attributes
+    ----------
+    processor: ProcessData
+        The processor the data is loaded with, its processed output and
+        company indexes are those of the last load
+    max_entries: int
+        Number of query results kept in the cache
+    hits, misses: int
+        Cache statistics since the service was created
+
+    Public Methods
+    ----------
+    refresh():
+        Reloads the data if the source files changed, returns True if it did
+    layoffs_by(key, start, end, top):
+        Total layoffs per industry/country/company/stage
+    mean_layoffs_by(key, start, end):
+        Mean layoffs per event per key
+    high_layoffs_by(key, threshold, top, exclude, other, start, end):
+        Number of companies per key with layoffs above a percentage
+    funding_by_stage(start, end, excluded_stages):
+        Mean funds raised and layoffs per funding stage
+    company_comp_salaries(companies):
+        Average compensation and layoffs of a set of companies
+    rollup_cube():
+        Returns the time rollup of the layoffs, built once per load
+    layoff_trend(freq, by, window, filters):
+        Layoffs per period (rolling over window periods), from the rollup
+    """
+    def __init__(self, data_directory: str, max_entries: int = 256, **process_options) -> None:
+        if process_options.get('chunksize'):
+            raise ValueError('QueryService keeps the data in memory, it cannot read it in chunks')
+        if process_options.get('shards'):
+            raise ValueError('QueryService keeps the data in memory, it cannot query layoff shards')
+        self.data_directory = data_directory
+        self.processor = ProcessData(data_directory, **process_options)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.__cache = OrderedDict()
+        self.__lock = threading.RLock()
+        self.__fingerprint = None
+        self.__layoffs = None
+        self.__dates = None
+        self.__cube = None
+        logger.debug(f'Initialized QueryService with data directory: {self.data_directory}')
+
+    def __repr__(self) -> str:
+        return f'QueryService object\nData directory:\n\t{os.path.abspath(self.data_directory)}\nCached results: {len(self.__cache)}'
+
+    def refresh(self) -> bool:
+        fingerprint = self.__source_fingerprint()
+        with self.__lock:
+            if fingerprint == self.__fingerprint:
+                return False
+            self.processor.process()
+            self.__layoffs = self.processor.sources.get('layoffs')
+            if self.__layoffs is not None:
+                # Malformed dates are NaT, outside every date window
+                self.__dates = pd.to_datetime(self.__layoffs['date'], errors='coerce')
+            self.__cube = None
+            self.__cache.clear()
+            self.__fingerprint = fingerprint
+            logger.debug(f'Loaded {self.data_directory}, cleared query cache')
+            return True
+
+    def layoffs_by(self, key: str, start: str = None, end: str = None, top: int = None) -> pd.DataFrame:
+        """
+        Total layoffs per key between start and end (inclusive dates),
+        largest first. The defaults give __industry_layoffs,
+        __country_layoffs and __company_layoffs.
+        """
+        def query(layoffs):
+            totals = layoffs[[key, 'total_laid_off']].groupby(key, observed=True).sum()
+            return totals.sort_values(by='total_laid_off', ascending=False)[:top]
+        return self.__query('layoffs_by', (key, start, end, top), query, key, start, end)
+
+    def mean_layoffs_by(self, key: str, start: str = None, end: str = None) -> pd.Series:
+        """
+        Mean layoffs per event per key, the default is __sector_layoffs
+        """
+        def query(layoffs):
+            return layoffs.groupby(key, observed=True)['total_laid_off'].mean()
+        return self.__query('mean_layoffs_by', (key, start, end), query, key, start, end)
+
+    def high_layoffs_by(self, key: str, threshold: float = HIGH_PERCENTAGE, top: int = None, exclude: tuple = (),
+                        other: str = None, start: str = None, end: str = None) -> pd.DataFrame:
+        """
+        Number of layoff events per key with percentage_laid_off above
+        threshold, largest first. Keys in exclude are left out, and when
+        other is given the keys after the top ones are summed into one
+        row with that label (other needs top). __high_per_industry is
+        high_layoffs_by('industry', top=10, exclude=('Other',)) and
+        __high_per_country is high_layoffs_by('country', top=5, other='Other Countries').
+        """
+        if other is not None and top is None:
+            raise ValueError(f'other ({other!r}) sums the keys after the top ones, it needs top')
+        def query(layoffs):
+            high = layoffs.loc[layoffs['percentage_laid_off'] > threshold]
+            high = high.loc[~high[key].isin(exclude)]
+            counts = high.groupby(key, observed=True)['company'].count().sort_values(ascending=False)
+            if other is not None:
+                counts = pd.concat([counts[:top], pd.Series({other: counts[top:].sum()})])
+                return pd.DataFrame(counts).rename(columns={0: 'number of companies'})
+            return pd.DataFrame(counts[:top]).rename(columns={'company': 'number of companies'})
+        return self.__query('high_layoffs_by', (key, threshold, top, tuple(exclude), other, start, end),
+                            query, key, start, end)
+
+    def funding_by_stage(self, start: str = None, end: str = None,
+                         excluded_stages: tuple = tuple(EXCLUDED_STAGES)) -> pd.DataFrame:
+        """
+        Mean funds raised and layoffs per funding stage, the default is
+        __company_funding_stage
+        """
+        def query(layoffs):
+            funds = layoffs[['company', 'stage', 'funds_raised', 'total_laid_off']]
+            funds = funds[~funds['stage'].isin(excluded_stages)]
+            stage_data = funds.groupby('stage', observed=True).mean(numeric_only=True).sort_values(by='total_laid_off', ascending=False)
+            stage_data['Funds raised per Layoff'] = stage_data['funds_raised'].div(stage_data['total_laid_off'])
+            return stage_data
+        return self.__query('funding_by_stage', (start, end, tuple(excluded_stages)), query, 'stage', start, end)
+
+    def company_comp_salaries(self, companies: list) -> pd.DataFrame:
+        """
+        Average compensation and layoffs of the companies, looked up in
+        the company indexes of the loaded data
+        """
+        companies = tuple(sorted(company.lower() for company in companies))
+        return self.__cached(('company_comp_salaries', companies),
+                             lambda: self.processor.company_comp_salaries(list(companies)))
+
+    def rollup_cube(self) -> RollupCube:
+        self.refresh()
+        with self.__lock:
+            if self.__cube is None:
+                self.__cube = RollupCube.from_frame(self.__window(None, None))
+            return self.__cube
+
+    def layoff_trend(self, freq: str = 'M', by: str = None, window: int = None, filters: dict = None) -> pd.DataFrame:
+        """
+        Total layoffs per period ('D', 'W', 'M', 'Q' or 'Y') and per value
+        of by, summed over the last window periods if window is given.
+        filters keeps only some industries/countries/stages, e.g.
+        {'country': ['United States', 'India']}
+        """
+        filter_key = tuple(sorted((dimension, tuple(values) if isinstance(values, (list, tuple)) else values)
+                                  for dimension, values in (filters or {}).items()))
+        def query():
+            cube = self.rollup_cube()
+            if window:
+                return cube.rolling(window, freq, by, filters)
+            return cube.series(freq, by, filters)
+        return self.__cached(('layoff_trend', freq, by, window, filter_key), query)
+
+    def __query(self, name: str, params: tuple, query, key: str, start: str, end: str):
+        """
+        Runs a layoffs query on the rows between start and end, through the cache
+        """
+        if key not in GROUP_KEYS:
+            raise ValueError(f'Unknown key {key}, should be one of {GROUP_KEYS}')
+        return self.__cached((name,) + params, lambda: query(self.__window(start, end)))
+
+    def __cached(self, cache_key: tuple, compute):
+        self.refresh()
+        with self.__lock:
+            if cache_key in self.__cache:
+                self.hits += 1
+                self.__cache.move_to_end(cache_key)
+                return self.__cache[cache_key].copy()
+            self.misses += 1
+            result = compute()
+            self.__cache[cache_key] = result
+            if len(self.__cache) > self.max_entries:
+                self.__cache.popitem(last=False)
+            return result.copy()
+
+    def __window(self, start: str, end: str) -> pd.DataFrame:
+        """
+        Layoff rows dated between start and end, inclusive
+        """
+        if self.__layoffs is None:
+            raise ValueError(f'No layoffs data in {self.data_directory}')
+        if start is None and end is None:
+            return self.__layoffs
+        mask = pd.Series(True, index=self.__layoffs.index)
+        if start is not None:
+            mask &= self.__dates >= pd.Timestamp(start)
+        if end is not None:
+            mask &= self.__dates <= pd.Timestamp(end)
+        return self.__layoffs.loc[mask]
+
+    def __source_fingerprint(self) -> tuple:
+        """
+        Path, modification time and size of every file ReadData reads
+        """
+        return DataTree(self.data_directory, tuple(READERS)).fingerprint()
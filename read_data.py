@@ -1,64 +1,289 @@
-import glob
+from __future__ import annotations
 import os
 import logging
-import pandas as pd
+from fnmatch import fnmatchcase
+from concurrent.futures import ThreadPoolExecutor
+from data_cache import DataCache
+from schema import SCHEMAS, Schema
+from instrumentation import profiled
+from discovery import DataTree
+from challenger_csv import read_challenger_csv
+from lazy_import import lazy_module
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
+pd = lazy_module('pandas')
+
+# Explicit column dtypes of the known datasets, other files are inferred
+DTYPES = {'layoffs': {'company':             'object',
+                      'location':            'object',
+                      'industry':            'object',
+                      'total_laid_off':      'float64',
+                      'percentage_laid_off': 'float64',
+                      'date':                'object',
+                      'stage':               'object',
+                      'country':             'object',
+                      'funds_raised':        'float64',
+                      },
+          'salaries': {'company':                 'object',
+                       'totalyearlycompensation': 'float64',
+                       },
+          }
+# Datasets streamed in chunks when ReadData is given a chunksize
+CHUNKED_DATASETS = ('layoffs', 'salaries')
+# Header row of the sheets of a workbook (key is the file's dataset
+# name), the first row by default
+HEADER_ROWS = {'CAL$HWS': 7,
+               'CAL$SHWS': 7,
+               }
+# Readers of each file extension, a list of (dataset name pattern,
+# reader), see @reader
+READERS = {}
+
+
+def reader(*extensions: str, names: tuple = ('*',)):
+    """
+    Registers a reader for the files with the given extensions, and only
+    those whose dataset name matches one of names. Readers registered for
+    specific names are tried before the ones for every name. A reader
+    takes the file path, its read options and the number of workers it
+    may use, and returns a dictionary, key is the dataset name, value is
+    its DataFrame (a file can hold several datasets).
+    """
+    def decorator(func):
+        for extension in extensions:
+            readers = READERS.setdefault(extension, [])
+            for name in names:
+                if name == '*':
+                    readers.append((name, func))
+                else:
+                    readers.insert(0, (name, func))
+        return func
+    return decorator
+
+
+def find_reader(filepath: str):
+    """
+    The reader of a file, None if it has none
+    """
+    name = data_name(filepath)
+    readers = READERS.get(os.path.splitext(filepath)[1], [])
+    return next((func for pattern, func in readers if fnmatchcase(name, pattern)), None)
+
+
+def data_name(filepath: str) -> str:
+    return os.path.split(filepath)[-1].split('.')[0]
+
+
+@reader('.csv')
+def read_csv(filepath: str, options: dict, workers: int = 1) -> dict:
+    """
+    Uses Pandas read_csv method to load the data into a dataframe
+    """
+    return {data_name(filepath): pd.read_csv(filepath, dtype=options.get('dtype'))}
+
+
+@reader('.xlsx', '.xls')
+def read_workbook(filepath: str, options: dict, workers: int = 1) -> dict:
+    """
+    Every non-empty sheet of a workbook, each parsed once from the open
+    workbook. A workbook with one non-empty sheet is named after the
+    file, otherwise each sheet is a dataset named '<file>:<sheet>'.
+    """
+    header = options.get('header', 0)
+    with pd.ExcelFile(filepath) as workbook:
+        sheet_names = workbook.sheet_names
+        sheets = [workbook.parse(sheet_name, header=header) for sheet_name in sheet_names]
+    sheets = {sheet_name: sheet for sheet_name, sheet in zip(sheet_names, sheets) if not sheet.empty}
+    if len(sheets) == 1:
+        return {data_name(filepath): next(iter(sheets.values()))}
+    return {f'{data_name(filepath)}:{sheet_name}': sheet for sheet_name, sheet in sheets.items()}
+
+
+@reader('.csv', names=('*_hiring', '*_reason'))
+def read_challenger(filepath: str, options: dict, workers: int = 1) -> dict:
+    """
+    Challenger yearly tables, see challenger_csv.py
+    """
+    return {data_name(filepath): read_challenger_csv(filepath)}
 
 
 class ReadData():
     """
     A class for dataprocessing CSV files in a directory.
 
+    Every file with a registered reader is read (CSVs, the Challenger
+    tables, and the sheets of .xlsx/.xls workbooks, see READERS), in the data directory and all of
+    its subdirectories (see discovery.py), on one pool of workers. The
+    datasets of a subdirectory are named '<subdirectory>/<name>'. With a
+    cache directory each file is parsed once and later runs only read
+    the cache.
+
     Attributes
     ----------
     data_directory: str
         The filepath of the data directory
+    fingerprints: dict
+        key is the path of each file found by the last process() run,
+        value is its (modification time, size)
+    workers: int
+        Number of files read concurrently
+    cache_dir: str
+        Directory of the parsed DataFrame cache, None disables caching
+    compact: bool
+        Convert the known datasets to the compact dtypes in schema.SCHEMAS
+    memory_reports: dict
+        key is the name of a compacted dataset, value is its per-column
+        memory before and after (only for files parsed on this run)
+    profiler: Profiler
+        Records each CSV read (see instrumentation.py), None disables it
+    chunksize: int
+        When set, the datasets in CHUNKED_DATASETS are not loaded but
+        returned as CsvChunks of this many rows (see chunked.py)
+    patterns: tuple
+        Dataset name patterns (like ProcessData.routes), files whose
+        dataset name matches none of them are skipped without being
+        read. None reads every file
 
     Public Methods
     ----------
     process():
         Returns a dictionary, key is the name of the dataset
         value is the DataFrame for that dataset
-
+    discover():
+        Returns the path of every readable file, and records their
+        fingerprints
+    load(filepath):
+        Returns the datasets of one file, named like in process()
+    dataset_name(filepath):
+        Returns the name process() gives the dataset of a single
+        dataset file
     """
-    def __init__(self, data_directory: str) -> None:
+    def __init__(self, data_directory: str, workers: int = 1, cache_dir: str = None,
+                 compact: bool = False, profiler=None, chunksize: int = None, patterns: tuple = None) -> None:
         self.data_dir = data_directory
+        self.workers = workers
+        self.cache = DataCache(cache_dir) if cache_dir else None
+        self.compact = compact
+        self.memory_reports = {}
+        self.profiler = profiler
+        self.chunksize = chunksize
+        self.patterns = patterns
+        self.fingerprints = {}
         logger.debug(f'Initialized ReadData with data directory: {self.data_dir}')
     
     def process(self) -> dict:
         """
-        Finds all CSVs in the data directory, processes them into
-        DataFrames, and returns a dictionary w/ all of them.
+        Finds all readable files in the data directory, processes them
+        into DataFrames, and returns a dictionary w/ all of them.
         """
         all_data = {}
-        csv_names = self.__find_csvs()
-        for csv_name in csv_names:
-            try:
-                csv_data = self.__process_csv(csv_name)
-                data_name = os.path.split(csv_name)[-1].split('.')[0]
-                all_data[data_name] = csv_data
-            except Exception as e:
-                logger.error(f'Error processing {csv_name}: {e}')
+        filepaths = self.discover()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for datasets in pool.map(self.load, filepaths):
+                all_data.update(datasets)
         logger.debug(f'Processed {len(all_data)} datasets')
         return all_data
 
-    def __find_csvs(self) -> list:
+    def discover(self) -> list:
+        self.fingerprints = {filepath: stamp for filepath, stamp in DataTree(self.data_dir, tuple(READERS)).discover().items()
+                             if self.__wanted(filepath)}
+        return list(self.fingerprints)
+
+    def load(self, filepath: str) -> dict:
+        directory = DataTree(self.data_dir, ()).relative_directory(filepath)
+        return {f'{directory}/{name}' if directory else name: data
+                for name, data in self.__load_file(filepath).items()}
+
+    def dataset_name(self, filepath: str) -> str:
+        directory = DataTree(self.data_dir, ()).relative_directory(filepath)
+        return f'{directory}/{data_name(filepath)}' if directory else data_name(filepath)
+
+    def __wanted(self, filepath: str) -> bool:
+        """
+        Whether the file's dataset name (or, for a workbook, the part of
+        a pattern before the ':<sheet>') matches one of the patterns
+        """
+        if self.patterns is None:
+            return True
+        name = data_name(filepath)
+        if any(fnmatchcase(name, pattern.split(':')[0]) for pattern in self.patterns):
+            return True
+        logger.debug(f'Skipping {filepath}, no pattern matches {name}')
+        return False
+
+    def __load_file(self, filepath: str) -> dict:
         """
-        Uses glob module to recursively find all .csv files in the directory
+        Loads the datasets of one file from the cache if it is up to date,
+        otherwise parses them (and stores them in the cache). Returns an
+        empty dictionary on errors.
         """
-        return glob.glob(os.path.join(self.data_dir, '*.csv'), recursive=True)
-            
-    def __process_csv(self, filepath: str) -> pd.DataFrame:
+        name = data_name(filepath)
+        file_reader = find_reader(filepath)
+        if file_reader is None:
+            logger.debug(f'No reader for {filepath}')
+            return {}
+        options = {'reader': file_reader.__name__, 'dtype': DTYPES.get(name), 'compact': self.compact}
+        if name in HEADER_ROWS:
+            options['header'] = HEADER_ROWS[name]
+        if self.chunksize and file_reader is read_csv and name in CHUNKED_DATASETS:
+            return {name: CsvChunks(filepath, self.chunksize, options['dtype'])}
+        try:
+            if self.cache:
+                datasets = self.cache.load(filepath, options)
+                if datasets is not None:
+                    return datasets
+            datasets = profiled(self.profiler, 'read', name, file_reader, filepath, options, self.workers)
+            if self.compact:
+                datasets = {dataset: self.__compact(dataset, data) if dataset in SCHEMAS else data
+                            for dataset, data in datasets.items()}
+            if self.cache:
+                self.cache.store(filepath, datasets, options)
+            return datasets
+        except Exception as e:
+            logger.error(f'Error processing {filepath}: {e}')
+            return {}
+
+    def __compact(self, data_name: str, data: pd.DataFrame) -> pd.DataFrame:
         """
-        Uses Pandas read_csv method to load the data into a dataframe
+        Applies the dataset's schema and records the memory saved
         """
-        data = pd.read_csv(filepath)
-        return data
+        compact_data = SCHEMAS[data_name].apply(data)
+        report = Schema.memory_report(data, compact_data)
+        self.memory_reports[data_name] = report
+        logger.debug(f'Compacted {data_name}: {report.loc["total", "before"]} -> {report.loc["total", "after"]} bytes')
+        return compact_data
+
+
+class CsvChunks():
+    """
+    A CSV that is read lazily, iterating over it yields DataFrames of at
+    most chunksize rows. The index continues across chunks like in the
+    whole file. Every iteration reads the file again.
+
+    Attributes
+    ----------
+    filepath: str
+        The CSV file
+    chunksize: int
+        Rows per chunk
+    dtype: dict
+        Column dtypes passed on to pd.read_csv
+    """
+    def __init__(self, filepath: str, chunksize: int, dtype: dict = None) -> None:
+        self.filepath = filepath
+        self.chunksize = chunksize
+        self.dtype = dtype
+
+    def __repr__(self) -> str:
+        return f'CsvChunks object\nFile:\n\t{os.path.abspath(self.filepath)}\nChunk size: {self.chunksize}'
+
+    def __iter__(self):
+        with pd.read_csv(self.filepath, dtype=self.dtype, chunksize=self.chunksize) as reader:
+            yield from reader
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
     data_directory = 'data'
     processor = ReadData(data_directory)
     data = processor.process()
@@ -0,0 +1,176 @@
+from __future__ import annotations
+import logging
+from lazy_import import lazy_module
+
+
+logger = logging.getLogger(__name__)
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+DIMENSIONS = ('industry', 'country', 'stage')
+MEASURES = ('total', 'total_count', 'rows')
+# Granularities and the finer one each is derived from
+FREQUENCIES = {'D': None,
+               'W': 'D',
+               'M': 'D',
+               'Q': 'M',
+               'Y': 'Q',
+               }
+
+
+class RollupCube():
+    """
+    Precomputed (period x industry x country x stage) rollup of the
+    layoffs total_laid_off column.
+
+    The date column is parsed once and every key is factorized once,
+    then the sum (total), number of reported values (total_count) and
+    number of events (rows) of each non-empty cell is computed with a
+    single bincount. Only non-empty cells are kept, so the size of the
+    cube is bounded by the number of rows, not by the product of the
+    dimension sizes. Weekly and monthly cells are derived from the daily
+    cells, quarterly from monthly and yearly from quarterly, without
+    going back to the rows. Rolling windows are differences of cumulative
+    sums over the periods, so they cost periods x groups, not rows.
+
+    Attributes
+    ----------
+    labels: dict
+        key is the dimension, value is the Index of its values (a cell
+        stores the position of its value in it)
+
+    Public Methods
+    ----------
+    from_frame(data):
+        Builds the daily cube of a layoffs DataFrame
+    cells(freq):
+        Returns the non-empty cells at a granularity
+    rollup(freq, by, filters):
+        Returns the measures per period and per value of the by dimensions
+    series(freq, by, filters, measure):
+        Returns a dense period x group table of one measure
+    rolling(window, freq, by, filters, measure):
+        Returns the sum of one measure over the last window periods
+    """
+    def __init__(self, daily_cells: pd.DataFrame, labels: dict) -> None:
+        self.labels = labels
+        self.__levels = {'D': daily_cells}
+
+    def __repr__(self) -> str:
+        sizes = ', '.join(f'{dimension}: {len(values)}' for dimension, values in self.labels.items())
+        return f'RollupCube object\nDaily cells: {len(self.__levels["D"])}\nDimensions:\n\t{sizes}'
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame) -> 'RollupCube':
+        """
+        Rows without a valid date are left out, missing dimension values are
+        kept as their own (NaN) value.
+        """
+        dates = pd.to_datetime(data['date'], errors='coerce').to_numpy()
+        dated = ~np.isnat(dates)
+        # Daily period ordinals are days since 1970-01-01
+        days = dates[dated].astype('datetime64[D]').astype('int64')
+        total = pd.to_numeric(data['total_laid_off'], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)[dated]
+        reported = ~np.isnan(total)
+        first = days.min() if len(days) else 0
+        codes, labels = [days - first], {}
+        for dimension in DIMENSIONS:
+            dimension_codes, values = pd.factorize(data[dimension].to_numpy()[dated], sort=True, use_na_sentinel=False)
+            codes.append(dimension_codes)
+            labels[dimension] = pd.Index(values, name=dimension)
+        shape = ((int(codes[0].max()) + 1 if len(days) else 1,)
+                 + tuple(len(labels[dimension]) or 1 for dimension in DIMENSIONS))
+        cell_codes, cell_keys = pd.factorize(np.ravel_multi_index(codes, shape), sort=True)
+        cells = pd.DataFrame(dict(zip(('period',) + DIMENSIONS, np.unravel_index(cell_keys, shape))), dtype='int64')
+        cells['period'] += first
+        cells['total'] = np.bincount(cell_codes, weights=np.where(reported, total, 0.0), minlength=len(cell_keys))
+        cells['total_count'] = np.bincount(cell_codes, weights=reported, minlength=len(cell_keys)).astype('int64')
+        cells['rows'] = np.bincount(cell_codes, minlength=len(cell_keys))
+        logger.debug(f'Rolled up {len(days)} layoff rows into {len(cells)} daily cells')
+        return cls(cells, labels)
+
+    def cells(self, freq: str = 'D') -> pd.DataFrame:
+        """
+        Non-empty cells at a granularity, 'period' holds the pandas
+        Period ordinal of the cell
+        """
+        if freq not in FREQUENCIES:
+            raise ValueError(f'Unknown frequency {freq}, should be one of {list(FREQUENCIES)}')
+        if freq not in self.__levels:
+            finer = self.cells(FREQUENCIES[freq])
+            periods, positions = np.unique(finer['period'].to_numpy(), return_inverse=True)
+            coarser = _periods(periods, freq=FREQUENCIES[freq]).asfreq(freq).asi8
+            cells = finer.assign(period=coarser[positions])
+            self.__levels[freq] = cells.groupby(['period', *DIMENSIONS], sort=True).sum().reset_index()
+            logger.debug(f'Derived {len(self.__levels[freq])} {freq} cells from {len(finer)} {FREQUENCIES[freq]} cells')
+        return self.__levels[freq]
+
+    def rollup(self, freq: str = 'M', by: tuple = (), filters: dict = None) -> pd.DataFrame:
+        """
+        Measures per period and per value of the by dimensions, for the
+        cells matching filters (key is a dimension, value is one value
+        or a list of values)
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        cells = self.__filtered(freq, filters)
+        grouped = cells.groupby(['period', *by], sort=True)[list(MEASURES)].sum()
+        index = [_periods(grouped.index.get_level_values('period'), freq=freq)]
+        index += [self.labels[dimension][grouped.index.get_level_values(dimension)] for dimension in by]
+        grouped.index = pd.MultiIndex.from_arrays(index, names=['period', *by]) if by else index[0].rename('period')
+        return grouped
+
+    def series(self, freq: str = 'M', by: str = None, filters: dict = None, measure: str = 'total') -> pd.DataFrame:
+        """
+        Dense table of one measure, one row per period from the first to
+        the last dated event (empty periods are 0) and one column per
+        value of by (a single column named after the measure without by)
+        """
+        cells = self.__filtered(freq, filters)
+        everything = self.cells(freq)['period']
+        first = everything.min() if len(everything) else 0
+        periods = int(everything.max() - first + 1) if len(everything) else 0
+        if by:
+            groups, group_codes = self.labels[by], cells[by].to_numpy()
+        else:
+            groups, group_codes = pd.Index([measure]), np.zeros(len(cells), dtype='int64')
+        flat = (cells['period'].to_numpy() - first) * len(groups) + group_codes
+        values = np.bincount(flat, weights=cells[measure].to_numpy(dtype='float64'), minlength=periods*len(groups))
+        table = pd.DataFrame(values.reshape(periods, len(groups)), columns=groups,
+                             index=_periods(np.arange(first, first + periods), freq=freq).rename('period'))
+        if by and filters and by in filters:
+            # Only the columns of the values asked for
+            table = table.iloc[:, np.sort(self.__codes(by, filters[by]))]
+        return table
+
+    def rolling(self, window: int, freq: str = 'M', by: str = None, filters: dict = None,
+                measure: str = 'total') -> pd.DataFrame:
+        """
+        Sum of a measure over each period and the window-1 before it (the
+        first periods sum over the periods there are)
+        """
+        table = self.series(freq, by, filters, measure)
+        cumulative = np.vstack([np.zeros((1, table.shape[1])), np.cumsum(table.to_numpy(), axis=0)])
+        ends = np.arange(1, len(table) + 1)
+        rolled = cumulative[ends] - cumulative[np.maximum(ends - window, 0)]
+        return pd.DataFrame(rolled, index=table.index, columns=table.columns)
+
+    def __filtered(self, freq: str, filters: dict) -> pd.DataFrame:
+        cells = self.cells(freq)
+        for dimension, values in (filters or {}).items():
+            cells = cells.loc[cells[dimension].isin(self.__codes(dimension, values))]
+        return cells
+
+    def __codes(self, dimension: str, values) -> np.ndarray:
+        """
+        Positions of one value or a list of values in the labels of a dimension
+        """
+        values = [values] if isinstance(values, str) or not np.iterable(values) else list(values)
+        codes = self.labels[dimension].get_indexer(values)
+        return codes[codes >= 0]
+
+
+def _periods(ordinals, freq: str) -> pd.PeriodIndex:
+    """
+    PeriodIndex of pandas Period ordinals
+    """
+    return pd.PeriodIndex(ordinal=np.asarray(ordinals, dtype='int64'), freq=freq)
@@ -0,0 +1,140 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from instrumentation import profiled
+
+
+logger = logging.getLogger(__name__)
+
+
+def requires(*inputs: str):
+    """
+    Declares the datasets and intermediate results a processing function
+    consumes, in the order it takes them. A function with one input is
+    called with it directly, a function with several is called with a
+    list of them (like __company_comp_salaries).
+    """
+    def decorator(func):
+        func.requires = inputs
+        return func
+    return decorator
+
+
+class Scheduler():
+    """
+    Runs processing functions as a dependency graph.
+
+    Every node names the datasets or other nodes it consumes. A node runs
+    as soon as all of its inputs are available, so independent nodes run
+    concurrently on the worker pool and an intermediate shared by several
+    nodes is computed only once.
+
+    Attributes
+    ----------
+    workers: int
+        Number of nodes run concurrently
+    profiler: Profiler
+        Records each node call (see instrumentation.py), None disables it
+    timings: dict
+        key is the node name, value is a dictionary with its start, end
+        and duration in seconds (relative to the start of the run)
+
+    Public Methods
+    ----------
+    add(name, func, inputs):
+        Adds a node to the graph
+    run(sources):
+        Runs every node whose inputs can be satisfied and returns a
+        dictionary, key is the node name, value is its result
+    reachable(sources):
+        Returns the nodes whose inputs are all sources or reachable nodes
+    ready(available, started):
+        Returns the nodes not started yet whose inputs are all available
+    call(name, available, run_start):
+        Runs one node on its available inputs, timed and profiled
+    critical_path():
+        Returns the chain of dependent nodes that took the longest
+    """
+    def __init__(self, workers: int = 1, profiler=None) -> None:
+        self.workers = workers
+        self.profiler = profiler
+        self.nodes = {}
+        self.timings = {}
+
+    def __repr__(self) -> str:
+        return 'Scheduler object\nNodes:\n\t' + '\n\t'.join(f'{name} <- {inputs}' for name, (_, inputs) in self.nodes.items())
+
+    def add(self, name: str, func, inputs: tuple) -> None:
+        self.nodes[name] = (func, tuple(inputs))
+
+    def run(self, sources: dict) -> dict:
+        """
+        Runs the graph on the given datasets. Nodes whose inputs are
+        missing (e.g. no salaries dataset) are skipped along with every
+        node that depends on them.
+        """
+        available = dict(sources)
+        pending = self.reachable(sources)
+        for name in self.nodes:
+            if name not in pending:
+                logger.debug(f'Skipping {name}, missing inputs {self.nodes[name][1]}')
+        results = {}
+        self.timings = {}
+        run_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            running = {}
+            while pending or running:
+                for name in self.ready(available, [name for name in self.nodes if name not in pending]):
+                    pending.remove(name)
+                    running[pool.submit(self.call, name, available, run_start)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    available[name] = results[name] = future.result()
+        logger.debug(f'Ran {len(results)} nodes in {time.perf_counter() - run_start:.4f} s')
+        return results
+
+    def critical_path(self) -> list:
+        """
+        Longest chain of dependent nodes by total duration
+        """
+        finish = {}
+        previous = {}
+        for name in sorted(self.timings, key=lambda name: self.timings[name]['end']):
+            parents = [i for i in self.nodes[name][1] if i in finish]
+            parent = max(parents, key=finish.get, default=None)
+            previous[name] = parent
+            finish[name] = self.timings[name]['duration'] + (finish[parent] if parent else 0)
+        path = []
+        name = max(finish, key=finish.get, default=None)
+        while name:
+            path.insert(0, name)
+            name = previous[name]
+        return path
+
+    def reachable(self, sources) -> list:
+        runnable = []
+        added = True
+        while added:
+            added = False
+            for name, (_, inputs) in self.nodes.items():
+                if name not in runnable and all(i in sources or i in runnable for i in inputs):
+                    runnable.append(name)
+                    added = True
+        return runnable
+
+    def ready(self, available: dict, started) -> list:
+        return [name for name, (_, inputs) in self.nodes.items()
+                if name not in started and all(i in available for i in inputs)]
+
+    def call(self, name: str, available: dict, run_start: float):
+        func, inputs = self.nodes[name]
+        inputs = [available[i] for i in inputs]
+        start = time.perf_counter()
+        result = profiled(self.profiler, 'process', name, func, inputs[0] if len(inputs) == 1 else inputs)
+        end = time.perf_counter()
+        self.timings[name] = {'start': start - run_start,
+                              'end': end - run_start,
+                              'duration': end - start,
+                              }
+        return result
@@ -0,0 +1,106 @@
+from __future__ import annotations
+import logging
+from lazy_import import lazy_module
+
+
+logger = logging.getLogger(__name__)
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+
+class Schema():
+    """
+    Compact in-memory dtypes for a dataset.
+
+    Attributes
+    ----------
+    categorical: list
+        Text columns stored as (ordered, so groupby keeps them sorted)
+        categoricals when they have few distinct values
+    integer: list
+        Numeric columns downcast to the smallest nullable integer type
+        that holds them (left as floats if they have fractional values)
+    floating: list
+        Numeric columns downcast to float32
+    dates: dict
+        key is a date column, value is its strftime format
+    max_cardinality: float
+        A categorical column is only converted if its number of distinct
+        values is at most this fraction of its length
+
+    Public Methods
+    ----------
+    apply(data):
+        Returns a copy of data with the compact dtypes
+    memory_report(before, after):
+        Returns a DataFrame with the memory of each column in both frames
+    """
+    def __init__(self, categorical: list = None, integer: list = None, floating: list = None,
+                 dates: dict = None, max_cardinality: float = 0.5) -> None:
+        self.categorical = categorical or []
+        self.integer = integer or []
+        self.floating = floating or []
+        self.dates = dates or {}
+        self.max_cardinality = max_cardinality
+
+    def __repr__(self) -> str:
+        return (f'Schema object\ncategorical: {self.categorical}\ninteger: {self.integer}'
+                f'\nfloating: {self.floating}\ndates: {self.dates}')
+
+    def apply(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Converts every column of the schema present in data
+        """
+        data = data.copy()
+        for column in self.categorical:
+            if column in data and data[column].nunique() <= self.max_cardinality*len(data):
+                categories = np.sort(data[column].dropna().unique())
+                data[column] = data[column].astype(pd.CategoricalDtype(categories, ordered=True))
+        for column in self.integer:
+            if column in data:
+                data[column] = self.__downcast_integer(data[column])
+        for column in self.floating:
+            if column in data:
+                data[column] = pd.to_numeric(data[column], errors='coerce').astype('float32')
+        for column, date_format in self.dates.items():
+            if column in data:
+                data[column] = pd.to_datetime(data[column], format=date_format, errors='coerce')
+        return data
+
+    @staticmethod
+    def __downcast_integer(column: pd.Series) -> pd.Series:
+        column = pd.to_numeric(column, errors='coerce')
+        values = column.dropna()
+        if (values % 1 != 0).any():
+            logger.debug(f'{column.name} has fractional values, keeping {column.dtype}')
+            return column
+        for dtype in ('Int8', 'Int16', 'Int32'):
+            limits = np.iinfo(dtype.lower())
+            if values.empty or (values.min() >= limits.min and values.max() <= limits.max):
+                return column.astype(dtype)
+        return column.astype('Int64')
+
+    @staticmethod
+    def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+        """
+        Deep memory usage in bytes of each column before and after
+        """
+        report = pd.DataFrame({'before': before.memory_usage(deep=True, index=False),
+                               'after': after.memory_usage(deep=True, index=False),
+                               })
+        report.loc['total'] = report.sum()
+        report['reduction'] = report['before'].div(report['after'])
+        return report
+
+
+# Schemas applied by ReadData(compact=True), key is the dataset name
+SCHEMAS = {'layoffs': Schema(categorical=['company', 'location', 'industry', 'stage', 'country'],
+                             integer=['total_laid_off'],
+                             # percentage_laid_off stays float64, float32(0.2) > 0.2
+                             floating=['funds_raised'],
+                             dates={'date': '%Y-%m-%d'},
+                             ),
+           'salaries': Schema(categorical=['company'],
+                              floating=['totalyearlycompensation'],
+                              ),
+           }
@@ -0,0 +1,165 @@
+# Map/reduce execution of the fused layoff functions over a partitioned
+# layoffs archive.
+#
+# Every node runs this script in map mode on its shards (CSV partitions
+# of the layoffs data) and writes their merged LayoffAggregates, pickled,
+# to stdout. The coordinator merges the partial aggregates of every node
+# and builds the outputs (sorting and top-N truncation happen only then).
+# A node is a command prefix, by default a local python process, e.g.
+#   ['ssh', 'worker1', 'python3', '/srv/project/sharded.py']
+# for a remote machine that has the shards at the same paths. The
+# coordinator unpickles whatever a node writes to stdout, and unpickling
+# can run arbitrary code, so only use nodes (and hosts) you trust.
+#
+# Usage:
+#   python sharded.py map SHARD [SHARD ...] > aggregates.pkl
+#   python sharded.py run SHARD [SHARD ...] [--nodes N]
+#       runs the map on N local worker processes and prints the results
+#   python sharded.py split LAYOFFS_CSV OUTPUT_DIR [--shards N]
+#       partitions a layoffs file into N CSVs
+
+from __future__ import annotations
+import argparse
+import logging
+import os
+import pickle
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from layoff_aggregates import LayoffAggregates, KEY_COLUMNS
+from read_data import DTYPES
+from lazy_import import lazy_module
+
+
+logger = logging.getLogger(__name__)
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+# Command that runs the map on a local worker process
+LOCAL_NODE = (sys.executable, os.path.abspath(__file__))
+
+
+class LayoffShards():
+    """
+    The CSV partitions of a layoffs archive. ProcessData puts it in
+    place of the layoffs DataFrame to run the layoff functions sharded.
+
+    Attributes
+    ----------
+    filepaths: list
+        The shard CSVs, as the nodes see them
+    """
+    def __init__(self, filepaths: list) -> None:
+        self.filepaths = list(filepaths)
+
+    def __repr__(self) -> str:
+        return f'LayoffShards object\nShards: {len(self.filepaths)}'
+
+
+class ShardCoordinator():
+    """
+    Runs the map on every node and reduces the partial aggregates.
+
+    The shards are dealt round-robin to the nodes, every node process is
+    started at once and their outputs are read concurrently, so the
+    nodes run in parallel. The partial aggregates are sums and counts per
+    key (the mean layoffs of __sector_layoffs is kept as sum and count),
+    so merging them gives exactly the aggregates of the whole archive.
+
+    Attributes
+    ----------
+    nodes: list
+        Command prefix of each node, the shard paths are appended to
+        'map'. By default local_workers local python processes
+    local_workers: int
+        Number of local processes used when no nodes are given
+
+    Public Methods
+    ----------
+    process(shards):
+        Returns a dictionary with the result of every fused layoff function
+    aggregate(shards):
+        Returns the merged LayoffAggregates of every shard
+    """
+    def __init__(self, nodes: list = None, local_workers: int = 2) -> None:
+        self.local_workers = local_workers
+        self.nodes = [list(node) for node in nodes] if nodes else [list(LOCAL_NODE)]*local_workers
+
+    def __repr__(self) -> str:
+        return f'ShardCoordinator object\nNodes: {len(self.nodes)}'
+
+    def process(self, shards: LayoffShards) -> dict:
+        return self.aggregate(shards).results()
+
+    def aggregate(self, shards: LayoffShards) -> LayoffAggregates:
+        assignments = [(node, shards.filepaths[i::len(self.nodes)]) for i, node in enumerate(self.nodes)]
+        assignments = [(node, filepaths) for node, filepaths in assignments if filepaths]
+        with ThreadPoolExecutor(max_workers=max(1, len(assignments))) as pool:
+            partials = list(pool.map(lambda assignment: self.__map(*assignment), assignments))
+        aggregates = empty_aggregates()
+        for partial in partials:
+            aggregates = aggregates.merge(partial)
+        logger.debug(f'Reduced {len(shards.filepaths)} shards from {len(assignments)} nodes')
+        return aggregates
+
+    @staticmethod
+    def __map(node: list, filepaths: list) -> LayoffAggregates:
+        """
+        Runs the map on one node and unpickles its partial aggregates
+        """
+        completed = subprocess.run(node + ['map'] + filepaths, capture_output=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f'Node {" ".join(node)} failed on {filepaths}:\n{completed.stderr.decode(errors="replace")}')
+        return pickle.loads(completed.stdout)
+
+
+def map_shards(filepaths: list) -> LayoffAggregates:
+    """
+    Merged aggregates of the shards of one node
+    """
+    aggregates = empty_aggregates()
+    for filepath in filepaths:
+        aggregates = aggregates.merge(LayoffAggregates.from_frame(pd.read_csv(filepath, dtype=DTYPES['layoffs'])))
+    return aggregates
+
+
+def empty_aggregates() -> LayoffAggregates:
+    columns = list(KEY_COLUMNS) + ['total_laid_off', 'percentage_laid_off', 'funds_raised']
+    return LayoffAggregates.from_frame(pd.DataFrame(columns=columns))
+
+
+def split_layoffs(filepath: str, output_dir: str, shards: int) -> list:
+    """
+    Partitions a layoffs CSV into shards CSVs of consecutive rows
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    data = pd.read_csv(filepath, dtype=DTYPES['layoffs'])
+    filepaths = []
+    for shard, rows in enumerate(np.array_split(np.arange(len(data)), shards)):
+        shard_path = os.path.join(output_dir, f'layoffs-{shard:05d}.csv')
+        data.iloc[rows].to_csv(shard_path, index=False)
+        filepaths.append(shard_path)
+    return filepaths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sharded aggregation of the layoff functions')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    map_parser = subparsers.add_parser('map', help='write the pickled aggregates of the shards to stdout')
+    map_parser.add_argument('shards', nargs='+')
+    run_parser = subparsers.add_parser('run', help='run the map on local worker processes and print the results')
+    run_parser.add_argument('shards', nargs='+')
+    run_parser.add_argument('--nodes', type=int, default=2)
+    split_parser = subparsers.add_parser('split', help='partition a layoffs CSV into shards')
+    split_parser.add_argument('layoffs')
+    split_parser.add_argument('output_dir')
+    split_parser.add_argument('--shards', type=int, default=4)
+    args = parser.parse_args()
+    if args.command == 'map':
+        pickle.dump(map_shards(args.shards), sys.stdout.buffer, protocol=pickle.HIGHEST_PROTOCOL)
+    elif args.command == 'run':
+        for name, result in ShardCoordinator(local_workers=args.nodes).process(LayoffShards(args.shards)).items():
+            print(f'{name}:\n{result}\n')
+    else:
+        for shard_path in split_layoffs(args.layoffs, args.output_dir, args.shards):
+            print(shard_path)
@@ -0,0 +1,202 @@
+# Bootstrap confidence intervals and what-if scenarios of the funding
+# and layoff summaries (__company_funding_stage, __high_per_industry).
+#
+# The layoffs are encoded once into NumPy arrays. A scenario is a set of
+# excluded stages, a high percentage threshold and a date window, each
+# one is a row mask. Every (scenario, resample) pair gets its own block
+# of group ids, so one np.bincount per sum computes the group sums of a
+# whole batch of scenarios and resamples at once.
+#
+# Usage:
+#   python simulation.py [LAYOFFS_CSV] [--by stage|industry] [--resamples N]
+#                        [--thresholds T [T ...]] [--workers N]
+#       prints the estimate and confidence interval of every metric
+
+from __future__ import annotations
+import os
+import argparse
+import logging
+import warnings
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+from layoff_aggregates import EXCLUDED_STAGES, HIGH_PERCENTAGE
+from lazy_import import lazy_module
+
+
+logger = logging.getLogger(__name__)
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+# Metrics of every group, the means are those of __company_funding_stage
+# and the count is the one of __high_per_industry
+METRICS = ('funds_raised',
+           'total_laid_off',
+           'Funds raised per Layoff',
+           'high percentage layoffs',
+           )
+# Rows x scenarios x resamples evaluated by one kernel call
+BATCH_ELEMENTS = 2**22
+
+
+class LayoffSimulator():
+    """
+    Evaluates the funding and layoff metrics of every stage (or
+    industry) under many scenarios and bootstrap resamples.
+
+    A scenario is a dictionary with the 'excluded_stages' (EXCLUDED_STAGES
+    by default), the high percentage 'threshold' (HIGH_PERCENTAGE by
+    default) and the date 'window', a (start, end) pair where either end
+    can be None (the whole data by default). Like in ProcessData, the
+    excluded stages only apply to the funding means (__funded_companies),
+    the high percentage count covers every stage. The estimates are computed
+    on the data itself, the confidence intervals are percentiles of the
+    metrics over the resamples (groups that a resample lacks are left
+    out). The resamples are split into batches of BATCH_ELEMENTS rows,
+    spread over a process pool and seeded per batch, so the results only
+    depend on the seed, not on the number of workers.
+
+    Attributes
+    ----------
+    by: str
+        Column the metrics are grouped by, 'stage' or 'industry'
+    groups: list
+        The groups, sorted
+    workers: int
+        Number of processes evaluating the batches
+    seed: int
+        Seed of the resamples
+
+    Public Methods
+    ----------
+    simulate(scenarios, resamples, confidence):
+        Returns a DataFrame indexed by scenario number and group, with the
+        estimate, lower and upper bound of every metric (the funding
+        means of the stages a scenario excludes are NaN)
+    scenario_grid(excluded_stages, thresholds, windows):
+        Returns every combination of the given scenario settings
+    """
+    def __init__(self, data: pd.DataFrame, by: str = 'stage', workers: int = 1, seed: int = 0) -> None:
+        self.by = by
+        self.workers = workers
+        self.seed = seed
+        data = data.loc[data[by].notna()]
+        group_codes, groups = pd.factorize(data[by], sort=True)
+        stage_codes, self.__stages = pd.factorize(data['stage'], sort=True)
+        self.groups = list(groups)
+        days = pd.to_datetime(data['date'], errors='coerce').to_numpy(dtype='datetime64[D]')
+        self.__encoded = {'groups':         group_codes.astype('int64'),
+                          'group_count':    len(self.groups),
+                          # Missing stages are -1, the last column of the exclusion table
+                          'stages':         stage_codes.astype('int64'),
+                          'days':           np.where(np.isnat(days), np.nan, days.astype('int64')),
+                          'funds_raised':   data['funds_raised'].to_numpy(dtype='float64'),
+                          'total_laid_off': data['total_laid_off'].to_numpy(dtype='float64'),
+                          'percentage':     data['percentage_laid_off'].to_numpy(dtype='float64'),
+                          }
+        logger.debug(f'Encoded {len(data)} layoff rows in {len(self.groups)} {by} groups')
+
+    def __repr__(self) -> str:
+        return f'LayoffSimulator object\nGroups: {len(self.groups)} {self.by}\nRows: {len(self.__encoded["groups"])}'
+
+    def simulate(self, scenarios: list = None, resamples: int = 1000, confidence: float = 0.95) -> pd.DataFrame:
+        scenarios = scenarios or [{}]
+        settings = self.__scenario_arrays(scenarios)
+        rows = len(self.__encoded['groups'])
+        estimate = _simulate_batch(self.__encoded, settings, 0, None)[:, 0]
+        batch = max(1, BATCH_ELEMENTS // max(1, rows * len(scenarios)))
+        sizes = [min(batch, resamples - start) for start in range(0, resamples, batch)]
+        seeds = np.random.SeedSequence(self.seed).spawn(len(sizes))
+        processes = min(self.workers, len(sizes), os.cpu_count() or 1)
+        if processes > 1:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                batches = list(pool.map(_simulate_batch, [self.__encoded]*len(sizes), [settings]*len(sizes), sizes, seeds))
+        else:
+            batches = [_simulate_batch(self.__encoded, settings, size, seed) for size, seed in zip(sizes, seeds)]
+        logger.debug(f'Ran {resamples} resamples of {len(scenarios)} scenarios in {len(sizes)} batches')
+        with warnings.catch_warnings():
+            # Groups no resample has
+            warnings.simplefilter('ignore', RuntimeWarning)
+            lower, upper = np.nanquantile(np.concatenate(batches, axis=1), [(1 - confidence)/2, (1 + confidence)/2], axis=1) \
+                if sizes else np.full((2,) + estimate.shape, np.nan)
+        index = pd.MultiIndex.from_product([range(len(scenarios)), self.groups], names=['scenario', self.by])
+        columns = pd.MultiIndex.from_product([METRICS, ['estimate', 'lower', 'upper']])
+        values = np.stack([estimate, lower, upper], axis=-1).reshape(len(index), len(columns))
+        return pd.DataFrame(values, index=index, columns=columns).dropna(how='all')
+
+    @staticmethod
+    def scenario_grid(excluded_stages: list = None, thresholds: list = None, windows: list = None) -> list:
+        return [{'excluded_stages': excluded, 'threshold': threshold, 'window': window}
+                for excluded, threshold, window in product(excluded_stages or [EXCLUDED_STAGES],
+                                                           thresholds or [HIGH_PERCENTAGE],
+                                                           windows or [(None, None)])]
+
+    def __scenario_arrays(self, scenarios: list) -> dict:
+        """
+        Scenario settings as arrays, one row per scenario
+        """
+        stages = np.asarray(self.__stages, dtype=object)
+        excluded = np.zeros((len(scenarios), len(stages) + 1), dtype=bool)
+        windows = np.full((len(scenarios), 2), np.nan)
+        for i, scenario in enumerate(scenarios):
+            excluded[i, :-1] = np.isin(stages, list(scenario.get('excluded_stages', EXCLUDED_STAGES)))
+            for j, end in enumerate(scenario.get('window') or (None, None)):
+                if end is not None:
+                    windows[i, j] = np.datetime64(pd.Timestamp(end).date(), 'D').astype('int64')
+        return {'excluded': excluded,
+                'thresholds': np.array([scenario.get('threshold', HIGH_PERCENTAGE) for scenario in scenarios], dtype='float64'),
+                'windows': windows,
+                }
+
+
+def _simulate_batch(encoded: dict, settings: dict, resamples: int, seed) -> np.ndarray:
+    """
+    Metrics of every scenario, resample and group, shape (scenarios,
+    resamples, groups, metrics). With no seed, the one 'resample' is the
+    data itself.
+    """
+    rows = len(encoded['groups'])
+    if seed is None:
+        rows_taken = np.arange(rows)[None, :]
+    else:
+        rows_taken = np.random.default_rng(seed).integers(0, rows, size=(resamples, rows))
+    scenario_count = len(settings['thresholds'])
+    group_count = encoded['group_count']
+    taken = {name: values[rows_taken] for name, values in encoded.items() if name != 'group_count'}
+    # (scenarios, resamples, rows) masks of the rows in each scenario's
+    # window, and of those the funding means keep (stages not excluded)
+    start, end = settings['windows'][:, 0, None, None], settings['windows'][:, 1, None, None]
+    windowed = (np.isnan(start) | (taken['days'] >= start)) & (np.isnan(end) | (taken['days'] <= end))
+    kept = windowed & ~settings['excluded'][:, taken['stages']]
+    high = windowed & (taken['percentage'] > settings['thresholds'][:, None, None])
+    blocks = np.arange(scenario_count * len(rows_taken)).reshape(scenario_count, len(rows_taken), 1)
+    ids = (taken['groups'] + blocks * group_count).ravel()
+    size = scenario_count * len(rows_taken) * group_count
+
+    def group_sums(weights) -> np.ndarray:
+        return np.bincount(ids, weights=np.broadcast_to(weights, windowed.shape).ravel(), minlength=size)
+
+    means = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name in ('funds_raised', 'total_laid_off'):
+            valid = kept & ~np.isnan(taken[name])
+            means[name] = group_sums(np.where(valid, taken[name], 0)) / group_sums(valid)
+        ratio = means['funds_raised'] / means['total_laid_off']
+    high_count = group_sums(high)
+    # Groups without any row in the window have no count
+    high_count[group_sums(windowed) == 0] = np.nan
+    metrics = np.stack([means['funds_raised'], means['total_laid_off'], ratio, high_count], axis=-1)
+    return metrics.reshape(scenario_count, len(rows_taken), group_count, len(METRICS))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bootstrap and scenario simulation of the funding and layoff metrics')
+    parser.add_argument('layoffs', nargs='?', default='data/layoffs.csv')
+    parser.add_argument('--by', default='stage', choices=['stage', 'industry'])
+    parser.add_argument('--resamples', type=int, default=1000)
+    parser.add_argument('--thresholds', type=float, nargs='+', default=None)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+    simulator = LayoffSimulator(pd.read_csv(args.layoffs), args.by, args.workers)
+    scenarios = LayoffSimulator.scenario_grid(thresholds=args.thresholds)
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(simulator.simulate(scenarios, args.resamples))
@@ -0,0 +1,327 @@
+from __future__ import annotations
+import math
+import logging
+from layoff_aggregates import HIGH_PERCENTAGE
+from lazy_import import lazy_module
+
+
+logger = logging.getLogger(__name__)
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+# ProcessData layoff functions that SketchLayoffs approximates
+SKETCH_FUNCTIONS = ('__company_layoffs',
+                    '__high_per_industry',
+                    '__high_per_country',
+                    )
+# Rows hashed and sketched at a time when the layoffs are in memory
+SKETCH_ROWS = 100_000
+
+
+def hash_values(values) -> np.ndarray:
+    """
+    64 bit hash of every value (strings included), vectorized. Values
+    are hashed one by one, without building a table of the distinct ones.
+    For a categorical Series (compact mode) only the categories are
+    hashed, it should have no missing values.
+    """
+    if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+        category_hashes = pd.util.hash_array(values.cat.categories.to_numpy(dtype=object), categorize=False)
+        return category_hashes[values.cat.codes.to_numpy()]
+    return pd.util.hash_array(np.asarray(values, dtype=object), categorize=False)
+
+
+class CountMinSketch():
+    """
+    Count-min sketch of weighted keys.
+
+    depth rows of width counters, each key adds its weight to one
+    counter per row (picked by a multiply-shift hash of the key's 64 bit
+    hash) and its estimate is the smallest of those counters. With
+    non-negative weights an estimate is never below the true sum, and
+    with probability 1 - delta it is at most epsilon x the total weight
+    above it. Sketches with the same shape and seed can be merged.
+
+    Attributes
+    ----------
+    epsilon: float
+        Error bound, relative to the total weight
+    delta: float
+        Probability of exceeding the error bound
+    width, depth: int
+        Shape of the counter table, e/epsilon and ln(1/delta)
+    total: float
+        Total weight added
+
+    Public Methods
+    ----------
+    update(hashes, weights):
+        Adds the weights of the keys with the given hashes
+    query(hashes):
+        Returns the estimated total weight of each key
+    merge(other):
+        Returns the sketch of both streams
+    """
+    def __init__(self, epsilon: float = 1e-4, delta: float = 1e-3, seed: int = 0) -> None:
+        self.epsilon = epsilon
+        self.delta = delta
+        self.seed = seed
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.total = 0.0
+        rng = np.random.default_rng(seed)
+        self.__multipliers = rng.integers(0, 2**63, size=self.depth, dtype='uint64') * np.uint64(2) + np.uint64(1)
+        self.__table = np.zeros((self.depth, self.width), dtype='float64')
+
+    def __repr__(self) -> str:
+        return f'CountMinSketch object\nShape: {self.depth} x {self.width}\nTotal weight: {self.total}'
+
+    def update(self, hashes: np.ndarray, weights: np.ndarray) -> None:
+        weights = np.asarray(weights, dtype='float64')
+        for row, columns in enumerate(self.__columns(hashes)):
+            self.__table[row] += np.bincount(columns, weights=weights, minlength=self.width)
+        self.total += weights.sum()
+
+    def query(self, hashes: np.ndarray) -> np.ndarray:
+        estimates = np.full(len(hashes), np.inf)
+        for row, columns in enumerate(self.__columns(hashes)):
+            np.minimum(estimates, self.__table[row, columns], out=estimates)
+        return estimates
+
+    def merge(self, other: 'CountMinSketch') -> 'CountMinSketch':
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise ValueError('Only sketches with the same shape and seed can be merged')
+        merged = CountMinSketch(self.epsilon, self.delta, self.seed)
+        merged.__table = self.__table + other.__table
+        merged.total = self.total + other.total
+        return merged
+
+    def __columns(self, hashes: np.ndarray):
+        """
+        Counter of each key in each row, from the high 32 bits of the
+        key hash times the row's odd multiplier
+        """
+        hashes = np.asarray(hashes, dtype='uint64')
+        for multiplier in self.__multipliers:
+            yield (((hashes * multiplier) >> np.uint64(32)) % np.uint64(self.width)).astype('int64')
+
+
+class TopK():
+    """
+    Heavy hitters of a weighted stream, backed by a count-min sketch.
+
+    Every key of a batch is added to the sketch, then the current
+    candidates and the batch's distinct keys are ranked by their sketch
+    estimate (which covers the whole stream so far) and the k largest
+    are kept. Only k keys and the sketch are held in memory, whatever
+    the number of distinct keys.
+
+    Attributes
+    ----------
+    k: int
+        Number of heavy hitters kept
+    sketch: CountMinSketch
+        Estimates of every key seen
+
+    Public Methods
+    ----------
+    update(keys, weights, hashes):
+        Adds a batch of keys and weights (hashes are the hash_values of
+        the keys, computed if not given)
+    top():
+        Returns the heavy hitters and their estimates, largest first
+    """
+    def __init__(self, k: int = 100, epsilon: float = 1e-4, delta: float = 1e-3, seed: int = 0) -> None:
+        self.k = k
+        self.sketch = CountMinSketch(epsilon, delta, seed)
+        self.__keys = np.array([], dtype=object)
+        self.__hashes = np.array([], dtype='uint64')
+
+    def __repr__(self) -> str:
+        return f'TopK object\nk: {self.k}\nCandidates: {len(self.__keys)}'
+
+    def update(self, keys, weights, hashes: np.ndarray = None) -> None:
+        keys = np.asarray(keys, dtype=object)
+        hashes = hash_values(keys) if hashes is None else hashes
+        self.sketch.update(hashes, weights)
+        batch_hashes, first = np.unique(hashes, return_index=True)
+        new = ~np.isin(batch_hashes, self.__hashes)
+        self.__hashes = np.concatenate([self.__hashes, batch_hashes[new]])
+        self.__keys = np.concatenate([self.__keys, keys[first[new]]])
+        self.__truncate()
+
+    def top(self) -> pd.Series:
+        estimates = self.sketch.query(self.__hashes)
+        order = np.argsort(-estimates, kind='stable')
+        return pd.Series(estimates[order], index=pd.Index(self.__keys[order]))
+
+    def __truncate(self) -> None:
+        if len(self.__hashes) > self.k:
+            keep = np.argpartition(-self.sketch.query(self.__hashes), self.k - 1)[:self.k]
+            self.__hashes, self.__keys = self.__hashes[keep], self.__keys[keep]
+
+
+class HyperLogLog():
+    """
+    HyperLogLog distinct counts, one counter per group.
+
+    Each group has 2^precision registers. A value's 64 bit hash picks a
+    register with its first precision bits and the register keeps the
+    highest rank (position of the first 1 bit) of the remaining bits.
+    The registers are updated for a whole batch at once, and the relative
+    standard error of a count is about 1.04/sqrt(2^precision).
+
+    Attributes
+    ----------
+    precision: int
+        log2 of the number of registers per group
+    groups: list
+        The group keys, in the order of the register rows
+
+    Public Methods
+    ----------
+    from_error(error):
+        Returns a HyperLogLog with the smallest precision giving that
+        relative standard error
+    update(groups, hashes):
+        Adds the values with these hash_values, each to the counter of
+        its group
+    counts():
+        Returns the estimated distinct values of each group
+    """
+    def __init__(self, precision: int = 12) -> None:
+        if not 4 <= precision <= 18:
+            raise ValueError(f'Precision should be between 4 and 18, got {precision}')
+        self.precision = precision
+        self.groups = []
+        self.__rows = {}
+        self.__registers = np.zeros((0, 2**precision), dtype='uint8')
+
+    def __repr__(self) -> str:
+        return f'HyperLogLog object\nPrecision: {self.precision}\nGroups: {len(self.groups)}'
+
+    @classmethod
+    def from_error(cls, error: float) -> 'HyperLogLog':
+        return cls(min(18, max(4, math.ceil(2*math.log2(1.04 / error)))))
+
+    def update(self, groups, hashes: np.ndarray) -> None:
+        for group in pd.unique(np.asarray(groups, dtype=object)):
+            if group not in self.__rows:
+                self.__rows[group] = len(self.groups)
+                self.groups.append(group)
+        if len(self.groups) > len(self.__registers):
+            added = np.zeros((len(self.groups) - len(self.__registers), 2**self.precision), dtype='uint8')
+            self.__registers = np.vstack([self.__registers, added])
+        rows = pd.Series(self.__rows).reindex(np.asarray(groups, dtype=object)).to_numpy(dtype='int64')
+        registers = (hashes >> np.uint64(64 - self.precision)).astype('int64')
+        ranks = _leading_zeros(hashes << np.uint64(self.precision)) + 1
+        ranks = np.minimum(ranks, 64 - self.precision + 1)
+        # Highest rank per (group, register): sort the packed keys and
+        # keep the last one of each cell
+        cells = (rows * 2**self.precision + registers) * 64 + ranks
+        cells = np.unique(cells)
+        last = np.append(cells[1:] // 64 != cells[:-1] // 64, True)
+        cells = cells[last]
+        flat = self.__registers.reshape(-1)
+        positions = cells // 64
+        flat[positions] = np.maximum(flat[positions], (cells % 64).astype('uint8'))
+
+    def counts(self) -> pd.Series:
+        m = 2**self.precision
+        alpha = 0.7213 / (1 + 1.079 / m)
+        registers = self.__registers.astype('float64')
+        raw = alpha * m * m / np.sum(np.exp2(-registers), axis=1)
+        zeros = np.count_nonzero(self.__registers == 0, axis=1)
+        # Linear counting for small cardinalities
+        small = (raw <= 2.5 * m) & (zeros > 0)
+        estimates = np.where(small, m * np.log(m / np.maximum(zeros, 1)), raw)
+        return pd.Series(estimates, index=pd.Index(self.groups, dtype=object))
+
+
+class SketchLayoffs():
+    """
+    Approximate __company_layoffs, __high_per_industry and
+    __high_per_country in one streaming pass with bounded memory.
+
+    The layoffs are sketched one chunk (or SKETCH_ROWS rows) at a time:
+    the total layoffs of every company go to a TopK of the k largest
+    companies, and the companies of high percentage layoffs go to a
+    HyperLogLog per industry and per country. __company_layoffs is only
+    the top k companies. The high_per functions count distinct companies
+    (the exact functions count layoff events, so a company with two high
+    layoffs counts twice there).
+
+    Attributes
+    ----------
+    top: int
+        Number of companies __company_layoffs keeps
+    epsilon, delta: float
+        Count-min error bound (relative to the total layoffs) and the
+        probability of exceeding it
+    distinct_error: float
+        Relative standard error of the distinct company counts
+
+    Public Methods
+    ----------
+    process(data):
+        Returns a dictionary with the approximate result of each function
+        in SKETCH_FUNCTIONS, for a DataFrame or an iterable of chunks
+    """
+    def __init__(self, top: int = 100, epsilon: float = 1e-4, delta: float = 1e-3,
+                 distinct_error: float = 0.01) -> None:
+        self.top = top
+        self.epsilon = epsilon
+        self.delta = delta
+        self.distinct_error = distinct_error
+
+    def __repr__(self) -> str:
+        return f'SketchLayoffs object\nTop: {self.top}\nError: {self.epsilon} (count-min), {self.distinct_error} (distinct)'
+
+    def process(self, data) -> dict:
+        chunks = data
+        if isinstance(data, pd.DataFrame):
+            chunks = (data.iloc[start:start + SKETCH_ROWS] for start in range(0, max(len(data), 1), SKETCH_ROWS))
+        companies = TopK(self.top, self.epsilon, self.delta)
+        high_companies = {key: HyperLogLog.from_error(self.distinct_error) for key in ('industry', 'country')}
+        rows = 0
+        for chunk in chunks:
+            named = chunk.loc[chunk['company'].notna()]
+            total = pd.to_numeric(named['total_laid_off'], errors='coerce').fillna(0).to_numpy(dtype='float64')
+            hashes = hash_values(named['company'])
+            companies.update(named['company'].to_numpy(dtype=object), total, hashes)
+            high = (pd.to_numeric(named['percentage_laid_off'], errors='coerce') > HIGH_PERCENTAGE).to_numpy()
+            for key, sketch in high_companies.items():
+                keyed = high & named[key].notna().to_numpy()
+                sketch.update(named[key].to_numpy(dtype=object)[keyed], hashes[keyed])
+            rows += len(chunk)
+        logger.debug(f'Sketched {rows} layoff rows')
+        company = companies.top().rename('total_laid_off').rename_axis('company')
+        per_industry = _distinct_counts(high_companies['industry'], 'industry')
+        per_industry = per_industry.loc[per_industry.index != 'Other'][:10]
+        per_country = _distinct_counts(high_companies['country'], 'country')
+        per_country = pd.concat([per_country[:5], pd.Series({'Other Countries': per_country[5:].sum()})])
+        return {'__company_layoffs':   pd.DataFrame(company),
+                '__high_per_industry': pd.DataFrame({'number of companies': per_industry}),
+                '__high_per_country':  pd.DataFrame({'number of companies': per_country}),
+                }
+
+
+def _distinct_counts(sketch: HyperLogLog, key: str) -> pd.Series:
+    """
+    Rounded distinct counts of a HyperLogLog, largest first
+    """
+    counts = sketch.counts().round().astype('int64').rename_axis(key)
+    return counts.sort_values(ascending=False, kind='stable')
+
+
+def _leading_zeros(values: np.ndarray) -> np.ndarray:
+    """
+    Number of leading zero bits of each uint64, from the exact float
+    log2 of its two 32 bit halves
+    """
+    high = (values >> np.uint64(32)).astype('float64')
+    low = (values & np.uint64(0xFFFFFFFF)).astype('float64')
+    with np.errstate(divide='ignore'):
+        high_zeros = np.where(high > 0, 31 - np.floor(np.log2(high)), 32)
+        low_zeros = np.where(low > 0, 31 - np.floor(np.log2(low)), 32)
+    return np.where(high > 0, high_zeros, 32 + low_zeros).astype('int64')
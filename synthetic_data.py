@@ -0,0 +1,162 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+# Value pools of the synthetic datasets, taken from data/layoffs.csv and
+# the Challenger tables
+INDUSTRIES = ['Other', 'Hardware', 'Consumer', 'Finance', 'Sales', 'Retail', 'Logistics', 'Marketing', 'Media',
+              'Infrastructure', 'Support', 'Real Estate', 'Food', 'Healthcare', 'HR', 'Education', 'Crypto',
+              'Transportation', 'Product', 'Security', 'Construction', 'Data', 'Legal', 'Fitness', 'Travel',
+              'Energy', 'Manufacturing', 'Recruiting', 'Aerospace']
+STAGES = {'Post-IPO': 402, 'Unknown': 377, 'Series B': 298, 'Series C': 296, 'Series D': 221, 'Series A': 173,
+          'Acquired': 159, 'Series E': 121, 'Seed': 64, 'Series F': 63, 'Private Equity': 38, 'Series H': 24,
+          'Series G': 14, 'Series J': 8, 'Series I': 7, 'Subsidiary': 2}
+COUNTRIES = {'United States': 1488, 'India': 142, 'Canada': 99, 'Brazil': 73, 'United Kingdom': 72, 'Germany': 65,
+             'Israel': 54, 'Australia': 50, 'Singapore': 34, 'Indonesia': 24, 'Sweden': 19, 'China': 18,
+             'Netherlands': 17, 'Nigeria': 10, 'France': 9, 'Spain': 8, 'Kenya': 7, 'Japan': 6}
+# Companies __company_comp_salaries looks for, so it has rows to join
+TOP_COMPANIES = ['Amazon', 'Google', 'Salesforce', 'Philips', 'Microsoft', 'Dell', 'Booking.com']
+TITLES = ['Software Engineer', 'Product Manager', 'Data Scientist', 'Hardware Engineer', 'Software Engineering Manager',
+          'Technical Program Manager', 'Solution Architect', 'Product Designer']
+HIRING_LABELS = ['Aerospace/Defense', 'Apparel', 'Automotive', 'Construction', 'Education', 'Energy', 'Entertainment',
+                 'Financial', 'Food', 'Government', 'Health_Care/Products', 'Industrial_Goods', 'Media', 'Retail',
+                 'Services', 'Technology', 'Telecommunications', 'Transportation', 'Utility', 'Warehousing']
+REASON_LABELS = ['Restructuring', 'Closing', 'No_Reason_Provided', 'Bankruptcy', 'Cost-Cutting', 'Contract_Loss',
+                 'Voluntary_Severance/Buyouts', 'Demand_Downturn', 'Acquisition/Merger', 'Market/Economic_Conditions']
+FIRST_DATE = np.datetime64('2020-03-11')
+LAST_DATE = np.datetime64('2023-02-20')
+# Share of missing values per column, as in data/layoffs.csv
+MISSING = {'total_laid_off': 0.31, 'percentage_laid_off': 0.33, 'funds_raised': 0.09}
+
+
+def company_names(count: int) -> np.ndarray:
+    """
+    The top companies followed by Company_<n> names
+    """
+    return np.array(TOP_COMPANIES + [f'Company_{idx}' for idx in range(count - len(TOP_COMPANIES))], dtype=object)
+
+
+def generate_layoffs(rows: int, seed: int = 0, companies: int = None, company_seed: int = None) -> pd.DataFrame:
+    """
+    Layoff events with the columns of data/layoffs.csv. Half the events
+    go to companies drawn uniformly and half follow a Zipf law (a few
+    companies have many events), like the real data. Categories
+    follow the frequencies of the real data and the numeric columns are
+    missing as often as in it. Every company keeps the industry, stage
+    and country drawn from company_seed (seed if None), so chunks
+    generated with different seeds agree on them.
+    """
+    rng = np.random.default_rng(seed)
+    companies = companies or max(len(TOP_COMPANIES), rows // 2)
+    names = company_names(companies)
+    company = np.where(rng.random(rows) < 0.5, rng.integers(0, companies, rows),
+                       np.minimum(rng.zipf(1.3, rows), companies) - 1)
+    stages = np.array(list(STAGES), dtype=object)
+    countries = np.array(list(COUNTRIES), dtype=object)
+    company_rng = np.random.default_rng(seed if company_seed is None else company_seed)
+    company_industry = company_rng.integers(0, len(INDUSTRIES), companies)
+    company_stage = company_rng.choice(len(stages), companies, p=_frequencies(STAGES))
+    company_country = company_rng.choice(len(countries), companies, p=_frequencies(COUNTRIES))
+    days = (LAST_DATE - FIRST_DATE).astype(int)
+    data = pd.DataFrame({'company': names[company],
+                         'location': countries[company_country[company]],
+                         'industry': np.array(INDUSTRIES, dtype=object)[company_industry[company]],
+                         'total_laid_off': np.round(rng.lognormal(4.5, 1.4, rows)),
+                         'percentage_laid_off': np.round(rng.beta(1.5, 6, rows), 2),
+                         'date': (LAST_DATE - rng.integers(0, days, rows)).astype(str),
+                         'stage': stages[company_stage[company]],
+                         'country': countries[company_country[company]],
+                         'funds_raised': np.round(rng.lognormal(4.5, 1.8, rows)),
+                         })
+    for column, share in MISSING.items():
+        data.loc[rng.random(rows) < share, column] = np.nan
+    return data.sort_values('date', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def generate_salaries(rows: int, seed: int = 0, companies: int = None) -> pd.DataFrame:
+    """
+    Salary reports with the columns __company_comp_salaries uses, company
+    names in mixed case like the levels.fyi data
+    """
+    rng = np.random.default_rng(seed + 1)
+    companies = companies or max(len(TOP_COMPANIES), rows // 20)
+    names = company_names(companies)
+    company = np.minimum(rng.zipf(1.5, rows), companies) - 1
+    company_names_cased = np.where(rng.random(rows) < 0.2, np.char.lower(names[company].astype(str)), names[company])
+    return pd.DataFrame({'timestamp': (LAST_DATE - rng.integers(0, 1500, rows)).astype(str),
+                         'company': company_names_cased,
+                         'title': np.array(TITLES, dtype=object)[rng.integers(0, len(TITLES), rows)],
+                         'totalyearlycompensation': np.round(rng.lognormal(12.2, 0.5, rows), -3).astype(int),
+                         'location': np.array(list(COUNTRIES), dtype=object)[rng.integers(0, len(COUNTRIES), rows)],
+                         })
+
+
+def generate_yearly_table(table: str, years: list, seed: int = 0) -> pd.DataFrame:
+    """
+    Challenger style yearly table ('hiring' or 'reason'), a label column,
+    one column of counts per year and a TOTAL row
+    """
+    rng = np.random.default_rng(seed)
+    label, labels = ('INDUSTRY', HIRING_LABELS) if table == 'hiring' else ('reason', REASON_LABELS)
+    counts = rng.lognormal(9, 1.5, (len(labels), len(years))).astype(int)
+    counts = np.vstack([counts, counts.sum(axis=0)])
+    table_df = pd.DataFrame(counts, columns=[str(year) for year in years])
+    table_df.insert(0, label, labels + ['TOTAL'])
+    return table_df
+
+
+def write_dataset(data_directory: str, layoff_rows: int, salary_rows: int = None, seed: int = 0,
+                  yearly_years: list = range(2013, 2023), chunk_rows: int = 1_000_000) -> dict:
+    """
+    Writes a synthetic data directory ProcessData can read: layoffs.csv,
+    salaries.csv and one <year>_hiring.csv/<year>_reason.csv per year.
+    Large files are generated and appended chunk_rows at a time, so the
+    row count is not limited by memory. Returns the written file paths.
+    """
+    os.makedirs(data_directory, exist_ok=True)
+    salary_rows = layoff_rows if salary_rows is None else salary_rows
+    files = {'layoffs': os.path.join(data_directory, 'layoffs.csv'),
+             'salaries': os.path.join(data_directory, 'salaries.csv'),
+             }
+    for name, rows, generator in [('layoffs', layoff_rows, generate_layoffs),
+                                  ('salaries', salary_rows, generate_salaries)]:
+        options = {'companies': max(len(TOP_COMPANIES), rows // (2 if name == 'layoffs' else 20))}
+        if name == 'layoffs':
+            options['company_seed'] = seed
+        for chunk, start in enumerate(range(0, rows, chunk_rows)):
+            chunk_df = generator(min(chunk_rows, rows - start), seed=seed + chunk, **options)
+            chunk_df.to_csv(files[name], mode='w' if chunk == 0 else 'a', header=chunk == 0, index=False)
+    for year in yearly_years:
+        for table in ('hiring', 'reason'):
+            files[f'{year}_{table}'] = os.path.join(data_directory, f'{year}_{table}.csv')
+            table_df = generate_yearly_table(table, [year], seed=seed + year)
+            # Same ', ' separated layout as the files in data/challenger_data
+            with open(files[f'{year}_{table}'], 'w') as csv_file:
+                csv_file.writelines(', '.join(str(cell) for cell in row) + '\n'
+                                    for row in [table_df.columns] + table_df.values.tolist())
+    logger.debug(f'Wrote {layoff_rows} layoff and {salary_rows} salary rows to {data_directory}')
+    return files
+
+
+def _frequencies(counts: dict) -> np.ndarray:
+    """
+    Probabilities proportional to counts
+    """
+    counts = np.array(list(counts.values()), dtype=float)
+    return counts / counts.sum()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Write a synthetic data directory')
+    parser.add_argument('data_directory')
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--salary-rows', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for path in write_dataset(args.data_directory, args.rows, args.salary_rows, args.seed).values():
+        print(path)